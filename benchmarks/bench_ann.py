@@ -0,0 +1,107 @@
+"""
+Recall@k vs latency for each VectorStore index type.
+
+Builds every index type over the same synthetic clustered 384-d corpus
+(real embeddings are clustered too, uniform noise would flatter IVF),
+uses exact Flat search as ground truth and sweeps nprobe / efSearch.
+
+--check-removal instead removes vectors from each index type that
+supports removal and verifies that every remaining vector still finds
+itself under its own ID (exits with status 1 otherwise).
+
+    python -m benchmarks.bench_ann --size 1000000 --queries 500
+    python -m benchmarks.bench_ann --check-removal
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from src.rag.vector_store import VectorStore
+
+
+def clustered_corpus(size: int, dimension: int, clusters: int, rng) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dimension), dtype=np.float32)
+    data = np.empty((size, dimension), dtype=np.float32)
+    for start in range(0, size, 100_000):
+        stop = min(size, start + 100_000)
+        data[start:stop] = centers[rng.integers(0, clusters, stop - start)]
+        data[start:stop] += 0.3 * rng.standard_normal((stop - start, dimension), dtype=np.float32)
+    return data
+
+
+def evaluate(store: VectorStore, queries: np.ndarray, truth: np.ndarray, k: int, **tunables):
+    found = []
+    start = time.perf_counter()
+    for query in queries:
+        found.append([store.texts.get(i) for i in store.search_ids(query, k, **tunables)])
+    latency = (time.perf_counter() - start) / len(queries)
+    recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+    return recall, latency
+
+
+def check_removal(index_type: str, dimension: int, rng, size: int = 20_000, lookups: int = 500) -> bool:
+    """Remove a block and a scattered set of IDs, then look every sampled survivor up by its own vector."""
+    data = rng.standard_normal((size, dimension), dtype=np.float32)
+    store = VectorStore(dimension, index_type, corpus_size=size)
+    store.add_embeddings([str(i) for i in range(size)], data)
+    removed = set(range(size // 10, size // 5)) | set(rng.choice(size, size // 20, replace=False).tolist())
+    store.remove_ids(sorted(removed))
+
+    survivors = rng.choice([i for i in range(size) if i not in removed], lookups, replace=False)
+    nprobe = getattr(store.index, "nlist", None)  # Exhaustive, so only the labels are under test
+    found = [store.search_ids(data[i], 1, nprobe=nprobe) for i in survivors]
+    wrong = sum(ids != [i] for ids, i in zip(found, survivors.tolist()))
+    stale = sum(ids[0] in removed for ids in found if ids)
+    ok = len(store) == size - len(removed) and wrong == 0
+    print(f"{index_type:<10} removed {len(removed):6d}  wrong self-lookups {wrong:4d}/{lookups}  "
+          f"removed IDs returned {stale:4d}  {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=["flat", "ivf_flat", "ivf_pq", "hnsw"])
+    parser.add_argument("--check-removal", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.check_removal:
+        results = [check_removal(t, args.dimension, rng) for t in args.types if VectorStore(args.dimension, t).supports_removal]
+        sys.exit(0 if all(results) else 1)
+
+    data = clustered_corpus(args.size, args.dimension, max(16, args.size // 1000), rng)
+    queries = data[rng.integers(0, args.size, args.queries)] + 0.1 * rng.standard_normal(
+        (args.queries, args.dimension), dtype=np.float32)
+    texts = [str(i) for i in range(args.size)]
+
+    exact = VectorStore(args.dimension, "flat")
+    exact.add_embeddings(texts, data)
+    truth = [[exact.texts[i] for i in exact.search_ids(q, args.k)] for q in queries]
+
+    sweeps = {
+        "flat": [{}],
+        "ivf_flat": [{"nprobe": n} for n in (1, 4, 16, 64)],
+        "ivf_pq": [{"nprobe": n} for n in (1, 4, 16, 64)],
+        "hnsw": [{"ef_search": e} for e in (16, 32, 64, 128)],
+    }
+
+    print(f"{'index':<10} {'tunable':<16} {'build':>8} {'recall@' + str(args.k):>10} {'latency':>12}")
+    for index_type in args.types:
+        store = VectorStore(args.dimension, index_type, corpus_size=args.size)
+        start = time.perf_counter()
+        store.add_embeddings(texts, data)
+        build = time.perf_counter() - start
+        for tunables in sweeps[index_type]:
+            recall, latency = evaluate(store, queries, truth, args.k, **tunables)
+            label = ",".join(f"{key}={value}" for key, value in tunables.items()) or "-"
+            print(f"{index_type:<10} {label:<16} {build:7.1f}s {recall:10.3f} {latency * 1000:10.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Latency benchmark: blocking RAGAgent.query() vs concurrent RAGAgent.aquery().
+
+The LLM is replaced by the local stub server, so the numbers isolate how
+well the pipeline overlaps requests and how long the event loop stalls.
+
+    python -m benchmarks.bench_async_query --requests 32 --latency-ms 800
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.stub_llm import StubLLM, start_stub_server
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.05) -> float:
+    """Return the worst event loop stall observed while the workload runs."""
+    worst = 0.0
+    while not stop.is_set():
+        before = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - before - interval)
+    return worst
+
+
+async def run_blocking(agent, queries):
+    # Mirrors the old process_query: the sync call runs on the event loop itself
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    latencies = []
+
+    async def one(query):
+        start = time.perf_counter()
+        agent.query(query)
+        latencies.append(time.perf_counter() - start)
+
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in queries))
+    wall = time.perf_counter() - start
+    stop.set()
+    return latencies, wall, await lag_task
+
+
+async def run_async(agent, queries):
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    latencies = []
+
+    async def one(query):
+        start = time.perf_counter()
+        await agent.aquery(query)
+        latencies.append(time.perf_counter() - start)
+
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in queries))
+    wall = time.perf_counter() - start
+    stop.set()
+    return latencies, wall, await lag_task
+
+
+def report(name, latencies, wall, lag):
+    print(
+        f"{name:<10} wall={wall:7.2f}s  p50={percentile(latencies, 50) * 1000:8.1f}ms  "
+        f"p95={percentile(latencies, 95) * 1000:8.1f}ms  mean={statistics.mean(latencies) * 1000:8.1f}ms  "
+        f"max_loop_stall={lag * 1000:8.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+
+    os.environ["OPENROUTER_BASE_URL"] = start_stub_server(StubLLM(args.latency_ms), port=args.port)
+    os.environ.setdefault("OPENROUTER_API_KEY", "stub")
+
+    from src.rag.agent import RAGAgent
+
+    agent = RAGAgent()
+    # Distinct queries so the response cache does not short-circuit the LLM
+    base = "How do I submit my weekly project in the AI bootcamp?"
+    blocking_queries = [f"{base} (blocking {i})" for i in range(args.requests)]
+    async_queries = [f"{base} (async {i})" for i in range(args.requests)]
+
+    async def run_both():
+        # One event loop for both runs: the async client and semaphore are loop bound
+        report("blocking", *await run_blocking(agent, blocking_queries))
+        report("aquery", *await run_async(agent, async_queries))
+
+    asyncio.run(run_both())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+BM25 keyword index: build time, memory and per-query latency.
+
+Generates a synthetic corpus whose word frequencies follow a Zipf
+distribution (like real text, a few terms have huge posting lists),
+indexes it and times 1-4 term queries plus the RRF merge with a dense
+candidate list.
+
+    python -m benchmarks.bench_bm25 --size 1000000 --queries 1000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.rag.bm25_index import BM25Index, reciprocal_rank_fusion
+
+
+def synthetic_chunks(size: int, words_per_chunk: int, vocabulary: int, rng):
+    words = np.array([f"w{i}" for i in range(vocabulary)])
+    for start in range(0, size, 10_000):
+        stop = min(size, start + 10_000)
+        ranks = np.minimum(rng.zipf(1.1, (stop - start, words_per_chunk)), vocabulary) - 1
+        for row in words[ranks]:
+            yield " ".join(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--words", type=int, default=80, help="words per chunk")
+    parser.add_argument("--vocabulary", type=int, default=200_000)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    index = BM25Index()
+    start = time.perf_counter()
+    batch = []
+    for text in synthetic_chunks(args.size, args.words, args.vocabulary, rng):
+        batch.append(text)
+        if len(batch) == 10_000:
+            index.add(list(range(len(index), len(index) + len(batch))), batch)
+            batch = []
+    if batch:
+        index.add(list(range(len(index), len(index) + len(batch))), batch)
+    build = time.perf_counter() - start
+
+    postings = sum(len(ids) for ids, _ in index.postings.values())
+    print(f"chunks:     {len(index):,}")
+    print(f"terms:      {len(index.postings):,}")
+    print(f"postings:   {postings:,}")
+    print(f"build:      {build:.1f}s")
+    print(f"memory:     {index.memory_bytes() / 2**20:.1f} MiB ({index.memory_bytes() / len(index):.0f} B/chunk)")
+
+    print(f"\n{'terms':>5} {'p50':>10} {'p95':>10} {'+rrf p50':>10}")
+    for term_count in (1, 2, 3, 4):
+        # Mix of common and rare terms, as in real questions
+        ranks = np.minimum(rng.zipf(1.3, (args.queries, term_count)), args.vocabulary) - 1
+        queries = [" ".join(f"w{r}" for r in row) for row in ranks]
+        latencies, fused = [], []
+        for query in queries:
+            t0 = time.perf_counter()
+            sparse = index.search(query, args.k)
+            t1 = time.perf_counter()
+            reciprocal_rank_fusion([list(rng.integers(0, args.size, args.k)), sparse], args.k)
+            latencies.append(t1 - t0)
+            fused.append(time.perf_counter() - t0)
+        print(f"{term_count:>5} {np.percentile(latencies, 50) * 1000:8.2f}ms "
+              f"{np.percentile(latencies, 95) * 1000:8.2f}ms {np.percentile(fused, 50) * 1000:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Prompt size and LLM latency: the old character heuristic vs ContextPacker.
+
+For each question the same retrieved candidates are turned into a prompt
+twice: joined whole (dropping to the first two only past 7000 characters,
+as RAGAgent used to) and packed into CONTEXT_TOKEN_BUDGET with overlap
+removal. Both prompts go to the local stub server, which charges
+--prefill-ms-per-1k per 1000 prompt tokens, so the latency difference
+reflects prompt size alone.
+
+    python -m benchmarks.bench_context_packing --top-k 6 --budget 600
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.stub_llm import StubLLM, start_stub_server
+
+QUESTIONS = [
+    "How do I submit my weekly project?",
+    "What is the schedule of the AI bootcamp?",
+    "Who do I contact if I miss a session?",
+    "Which tools should interns install before the first week?",
+    "How are intern projects evaluated?",
+    "Where can I find the recorded lectures?",
+    "What topics does the learning path cover?",
+    "How long is the internship training?",
+]
+
+
+def heuristic_context(docs, max_chars=7000):
+    if len(" ".join(docs)) > max_chars:
+        docs = docs[:2]
+    return docs
+
+
+async def timed_completion(generator, prompt):
+    start = time.perf_counter()
+    await generator.llm.async_client.chat.completions.create(**generator._completion_kwargs(prompt))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top-k", type=int, default=6)
+    parser.add_argument("--budget", type=int, default=None, help="defaults to CONTEXT_TOKEN_BUDGET")
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=400.0)
+    parser.add_argument("--port", type=int, default=8082)
+    args = parser.parse_args()
+
+    stub = StubLLM(args.latency_ms, prefill_ms_per_1k=args.prefill_ms_per_1k)
+    os.environ["OPENROUTER_BASE_URL"] = start_stub_server(stub, port=args.port)
+    os.environ.setdefault("OPENROUTER_API_KEY", "stub")
+
+    from src.rag.agent import RAGAgent
+
+    agent = RAGAgent()
+    packer = agent.context_packer
+    if args.budget is not None:
+        packer.budget = args.budget
+
+    rows = []
+    for question in QUESTIONS:
+        retrieval = agent.retriever.search_many([question], k=args.top_k)[0]
+        old_prompt = agent.generator.construct_prompt(question, heuristic_context(retrieval.docs))
+        new_prompt = agent.generator.construct_prompt(question, packer.pack(retrieval.docs)[0])
+        rows.append((question, old_prompt, new_prompt))
+
+    async def run():
+        results = []
+        for question, old_prompt, new_prompt in rows:
+            results.append((
+                packer.count_tokens(old_prompt), packer.count_tokens(new_prompt),
+                await timed_completion(agent.generator, old_prompt),
+                await timed_completion(agent.generator, new_prompt),
+            ))
+        return results
+
+    results = asyncio.run(run())
+
+    print(f"{'question':<58} {'old tok':>8} {'new tok':>8} {'old ms':>8} {'new ms':>8}")
+    for (question, _, _), (old_tokens, new_tokens, old_latency, new_latency) in zip(rows, results):
+        print(f"{question[:58]:<58} {old_tokens:8d} {new_tokens:8d} {old_latency * 1000:8.0f} {new_latency * 1000:8.0f}")
+
+    old_total = sum(r[0] for r in results)
+    new_total = sum(r[1] for r in results)
+    print(f"\nprompt tokens: {old_total} -> {new_total} ({100 * (1 - new_total / old_total):.1f}% fewer)")
+    print(f"mean LLM latency: {statistics.mean(r[2] for r in results) * 1000:.0f}ms -> "
+          f"{statistics.mean(r[3] for r in results) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
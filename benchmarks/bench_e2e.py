@@ -0,0 +1,379 @@
+"""
+End-to-end offline benchmark and load test of the whole bot.
+
+Nothing leaves the machine. The bundled docs/ are scaled into a synthetic
+corpus in a temporary directory, the LLM is the local stub server and
+Discord is replaced by stand-in channels, so /ask requests go through the
+bot's own process_query (rate limiter, fair queue, RAG agent, streaming
+reply). The model is taken from the usual model cache (run the bot once
+online first). Phases:
+
+    startup    RAGAgent over the new corpus: model load, cold ingestion
+               (split into embedding and the rest of the index build) and
+               a warm start from the saved index
+    retrieval  the query workload through the retriever, one query at a time
+    load       --requests /ask interactions, --concurrency in flight, from
+               --users users spread over --guilds guilds
+
+The workload draws from --unique-queries questions with Zipf --skew
+(0 = uniform), so repeats exercise the query and response caches.
+
+Results are printed and, with --output, written as JSON. --baseline
+compares against an earlier JSON file and exits with status 1 if a metric
+got worse by more than --tolerance.
+
+    python -m benchmarks.bench_e2e --scale 50 --requests 500 --output e2e.json
+    python -m benchmarks.bench_e2e --scale 50 --requests 500 --baseline e2e.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from benchmarks.bench_async_query import percentile
+from benchmarks.stub_llm import StubLLM, start_stub_server
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+QUESTIONS = [
+    "How do I submit my weekly project?",
+    "What is the schedule of the AI bootcamp?",
+    "Who do I contact if I miss a session?",
+    "Which tools should interns install before the first week?",
+    "How are intern projects evaluated?",
+    "Where can I find the recorded lectures?",
+    "What topics does the learning path cover?",
+    "How long is the internship training?",
+]
+
+# name: (column label, True if higher is better, False if lower, None to report only)
+METRICS = {
+    "corpus_files": ("corpus files", None),
+    "corpus_mib": ("corpus MiB", None),
+    "chunks": ("chunks", None),
+    "model_load_s": ("model load s", False),
+    "ingest_s": ("cold ingestion s", False),
+    "ingest_embed_s": ("  embedding s", False),
+    "index_build_s": ("  chunking + index build s", False),
+    "warm_start_s": ("warm index load s", False),
+    "startup_rss_mib": ("RSS after startup MiB", False),
+    "retrieval_p50_ms": ("retrieval p50 ms", False),
+    "retrieval_p95_ms": ("retrieval p95 ms", False),
+    "retrieval_p99_ms": ("retrieval p99 ms", False),
+    "retrieval_qps": ("retrieval queries/s", True),
+    "answered": ("answered", None),
+    "rejected": ("rejected", None),
+    "errors": ("errors", False),
+    "throughput_rps": ("answers/s", True),
+    "latency_p50_ms": ("/ask p50 ms", False),
+    "latency_p95_ms": ("/ask p95 ms", False),
+    "latency_p99_ms": ("/ask p99 ms", False),
+    "discord_calls_per_answer": ("Discord API calls/answer", False),
+    "llm_requests": ("LLM requests", None),
+    "llm_failures": ("failed LLM requests", False),
+    "peak_rss_mib": ("peak RSS MiB", False),
+}
+
+
+def build_corpus(source_dir: Path, target: Path, scale: int, seed: int):
+    """
+    Write scale variants of every bundled document. Paragraphs are
+    shuffled and tagged per variant so every chunk is new to the
+    embedding cache. Returns the number of files and bytes written.
+    """
+    from src.rag.ingest import discover_files
+
+    rng = random.Random(seed)
+    sources = discover_files(source_dir)
+    files = size = 0
+    for variant in range(scale):
+        variant_dir = target / f"{variant:04d}"
+        variant_dir.mkdir(parents=True)
+        for source in sources:
+            paragraphs = [p for p in source.read_text(encoding="utf-8").split("\n\n") if p.strip()]
+            rng.shuffle(paragraphs)
+            text = "\n\n".join(f"{p} [{variant}.{i}]" for i, p in enumerate(paragraphs))
+            (variant_dir / source.name).write_text(text, encoding="utf-8")
+            files += 1
+            size += len(text.encode("utf-8"))
+    return files, size
+
+
+def workload(requests: int, unique: int, skew: float, rng: random.Random):
+    """requests questions drawn from a pool of unique ones, rank r with weight 1 / r ** skew."""
+    pool = [
+        QUESTIONS[i % len(QUESTIONS)] + (f" ({i // len(QUESTIONS)})" if i >= len(QUESTIONS) else "")
+        for i in range(unique)
+    ]
+    return rng.choices(pool, weights=[1 / (rank + 1) ** skew for rank in range(unique)], k=requests)
+
+
+def rss_mib() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def metric(name: str, **labels) -> float:
+    from prometheus_client import REGISTRY
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def metric_total(name: str, **labels) -> float:
+    """Sum of the samples called name whose labels include labels."""
+    from prometheus_client import REGISTRY
+    return sum(
+        sample.value for family in REGISTRY.collect() for sample in family.samples
+        if sample.name == name and labels.items() <= sample.labels.items()
+    )
+
+
+class StandInMessage:
+    ids = itertools.count(1)
+
+    def __init__(self, channel: "StandInChannel", content=None, embeds=()):
+        self.id = next(self.ids)
+        self.channel = channel
+        self.content = content
+        self.embeds = list(embeds)
+
+    async def edit(self, **kwargs):
+        await self.channel.call()
+
+    async def add_reaction(self, emoji):
+        await self.channel.call()
+
+
+class StandInChannel:
+    """Collects what the bot sends; every Discord API call takes `latency` seconds."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.messages = []
+        self.calls = 0
+
+    async def call(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+
+    async def send(self, content=None, embed=None, embeds=(), **kwargs):
+        await self.call()
+        message = StandInMessage(self, content, [embed] if embed is not None else embeds)
+        self.messages.append(message)
+        return message
+
+
+def outcome(channel: StandInChannel, bot) -> str:
+    notices = {bot.QUEUE_FULL_MESSAGE: "queue_full", "Sorry, I encountered an error": "error"}
+    notices.update({message.split("{")[0]: f"{scope}_rate" for scope, message in bot.RATE_LIMITED_MESSAGES.items()})
+    for message in channel.messages:
+        for prefix, name in notices.items():
+            if message.content and message.content.startswith(prefix):
+                return name
+    return "answered" if any(message.embeds for message in channel.messages) else "no_reply"
+
+
+async def load_test(agent, queries, args):
+    from src.bot import discord_client as bot
+    from src.bot.admission import FairQueue, RateLimiter
+    from src.bot.delivery import background_tasks
+
+    bot.warmup.agent = agent
+    bot.request_queue = FairQueue()
+    bot.request_queue.start()
+    if not args.rate_limit:
+        bot.rate_limiter = RateLimiter(user_rate=1e12, user_burst=10 ** 9, guild_rate=1e12, guild_burst=10 ** 9)
+
+    rng = random.Random(args.seed)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, outcomes, answered_channels = [], {}, []
+
+    async def one(query: str):
+        user = rng.randrange(args.users)
+        channel = StandInChannel(args.discord_ms / 1000)
+        ctx = SimpleNamespace(author=SimpleNamespace(id=user), guild=SimpleNamespace(id=user % args.guilds),
+                              channel=channel)
+        async with semaphore:
+            start = time.perf_counter()
+            await bot.process_query(ctx, query)
+            elapsed = time.perf_counter() - start
+        result = outcome(channel, bot)
+        outcomes[result] = outcomes.get(result, 0) + 1
+        if result == "answered":
+            latencies.append(elapsed)
+            answered_channels.append(channel)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(query) for query in queries))
+    wall = time.perf_counter() - start
+    await asyncio.gather(*background_tasks)  # Reactions are added after the reply
+    answered = outcomes.get("answered", 0)
+    calls = sum(channel.calls for channel in answered_channels)
+    return {
+        "answered": answered,
+        "rejected": sum(outcomes.get(name, 0) for name in ("user_rate", "guild_rate", "queue_full")),
+        "errors": outcomes.get("error", 0) + outcomes.get("no_reply", 0),
+        "throughput_rps": answered / wall,
+        "latency_p50_ms": percentile(latencies, 50) * 1000 if latencies else None,
+        "latency_p95_ms": percentile(latencies, 95) * 1000 if latencies else None,
+        "latency_p99_ms": percentile(latencies, 99) * 1000 if latencies else None,
+        "discord_calls_per_answer": calls / answered if answered else None,
+    }, outcomes
+
+
+def run(args, work_dir: Path, stub: StubLLM, quiet):
+    from src.config.settings import INDEX_DIR, DEFAULT_TOP_K
+
+    metrics = {}
+    files, size = build_corpus(Path(args.source), work_dir / "docs", args.scale, args.seed)
+    metrics["corpus_files"], metrics["corpus_mib"] = files, size / 2 ** 20
+
+    with quiet():
+        from src.rag.agent import RAGAgent
+        from src.rag.index_store import IndexStore
+        from src.rag.query_cache import QueryCache
+
+        agent = RAGAgent()
+        start = time.perf_counter()
+        IndexStore(INDEX_DIR).sync(agent.document_loader)
+        metrics["warm_start_s"] = time.perf_counter() - start
+    metrics["chunks"] = len(agent.vector_store)
+    metrics["model_load_s"] = metric("startup_phase_seconds", phase="model_load")
+    metrics["ingest_s"] = metric("startup_phase_seconds", phase="index_sync")
+    metrics["ingest_embed_s"] = metric("rag_stage_seconds_sum", stage="index_embed")
+    metrics["index_build_s"] = metrics["ingest_s"] - metrics["ingest_embed_s"]
+    metrics["startup_rss_mib"] = rss_mib()
+
+    rng = random.Random(args.seed)
+    latencies = []
+    with quiet():
+        for query in workload(args.retrieval_queries, args.unique_queries, args.skew, rng):
+            start = time.perf_counter()
+            agent.retriever.search_many([query], k=DEFAULT_TOP_K)
+            latencies.append(time.perf_counter() - start)
+    for pct in (50, 95, 99):
+        metrics[f"retrieval_p{pct}_ms"] = percentile(latencies, pct) * 1000
+    metrics["retrieval_qps"] = len(latencies) / sum(latencies)
+    agent.retriever.cache = QueryCache()  # The load test starts with cold caches
+
+    with quiet():
+        load, outcomes = asyncio.run(load_test(agent, workload(args.requests, args.unique_queries, args.skew, rng), args))
+    metrics.update(load)
+    metrics["llm_requests"] = stub.requests
+    # The agent answers with an apology when every model fails, so count failures at the client
+    metrics["llm_failures"] = metric_total("llm_requests_total") - metric_total("llm_requests_total", result="success")
+    metrics["peak_rss_mib"] = peak_rss_mib()
+    return metrics, outcomes
+
+
+def compare(metrics: dict, baseline: dict, tolerance: float) -> list:
+    """Print each comparable metric next to the baseline; return the names that regressed."""
+    regressions = []
+    print(f"\n{'vs baseline':<28} {'baseline':>10} {'now':>10} {'change':>8}")
+    for name, (label, higher_is_better) in METRICS.items():
+        old, new = baseline.get(name), metrics.get(name)
+        if higher_is_better is None or old is None or new is None:
+            continue
+        change = (new - old) / old if old else (0.0 if new == old else float("inf"))
+        worse = -change if higher_is_better else change
+        flag = "  REGRESSED" if worse > tolerance else ""
+        if flag:
+            regressions.append(name)
+        print(f"{label:<28} {old:10.2f} {new:10.2f} {change * 100:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=str(REPO_DIR / "docs"), help="documents the corpus is scaled from")
+    parser.add_argument("--scale", type=int, default=20, help="variants of each source document")
+    parser.add_argument("--retrieval-queries", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--unique-queries", type=int, default=100)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of question popularity")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--guilds", type=int, default=10)
+    parser.add_argument("--rate-limit", action="store_true",
+                        help="apply the bot's user and guild rate limits (off: every request reaches the pipeline)")
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="stub LLM time to first token")
+    parser.add_argument("--token-delay-ms", type=float, default=20.0)
+    parser.add_argument("--discord-ms", type=float, default=50.0, help="latency of each Discord API call")
+    parser.add_argument("--port", type=int, default=8084)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="relative change counted as a regression")
+    parser.add_argument("--keep", action="store_true", help="keep the corpus and index directory")
+    parser.add_argument("--verbose", action="store_true", help="show the bot's own output")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so point them at the work directory first
+    work_dir = Path(tempfile.mkdtemp(prefix="rag-e2e-"))
+    os.environ["DOCS_DIR"] = str(work_dir / "docs")
+    os.environ["CACHE_DIR"] = str(work_dir / "cache")
+    os.environ.setdefault("MODEL_CACHE_DIR", str(REPO_DIR / "src" / "config" / "cache" / "models"))
+    os.environ["OPENROUTER_API_KEY"] = "stub"
+    os.environ.pop("RETRIEVAL_SERVICE_URL", None)
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    stub = StubLLM(args.latency_ms, token_delay_ms=args.token_delay_ms)
+    os.environ["OPENROUTER_BASE_URL"] = start_stub_server(stub, port=args.port)
+
+    def quiet():
+        return contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+
+    try:
+        metrics, outcomes = run(args, work_dir, stub, quiet)
+    finally:
+        if args.keep:
+            print(f"Work directory kept at {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    from src.config.settings import EMBEDDING_BACKEND, EMBEDDING_MODEL, INDEX_TYPE, LLM_MODEL
+    for name, (label, _) in METRICS.items():
+        value = metrics.get(name)
+        print(f"{label:<28} {'-' if value is None else f'{value:10.2f}':>10}")
+    print(f"{'/ask outcomes':<28} {json.dumps(outcomes)}")
+
+    results = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "verbose", "keep")},
+        "environment": {
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "embedding_model": EMBEDDING_MODEL, "embedding_backend": EMBEDDING_BACKEND,
+            "index_type": INDEX_TYPE, "llm_model": LLM_MODEL,
+        },
+        "metrics": metrics,
+        "outcomes": outcomes,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline.get("config") != results["config"]:
+            print("Warning: the baseline was run with different options")
+        if compare(metrics, baseline["metrics"], args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
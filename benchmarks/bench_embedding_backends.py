@@ -0,0 +1,137 @@
+"""
+Embedding backends side by side: torch, onnx and onnx-int8.
+
+Each backend is measured in a fresh process (exports are created first, so
+they are not timed):
+
+    import s     importing the backend's runtime (sentence-transformers + torch,
+                 or onnxruntime + tokenizers)
+    load s       loading the model
+    RSS MiB      resident memory after loading and encoding
+    query ms     median single-query latency over --queries questions
+    chunks/s     batch throughput on --chunks chunk-sized passages
+    parity       lowest cosine similarity to the torch embeddings
+
+    python -m benchmarks.bench_embedding_backends --backends torch onnx onnx-int8 --threads 1
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+QUESTIONS = [
+    "How do I submit my weekly project?",
+    "What is the schedule of the AI bootcamp?",
+    "Who do I contact if I miss a session?",
+    "Which tools should interns install before the first week?",
+    "How are intern projects evaluated?",
+    "Where can I find the recorded lectures?",
+    "What topics does the learning path cover?",
+    "How long is the internship training?",
+]
+
+WORDS = ("the intern project bootcamp session lecture model data python deploy review weekly mentor "
+         "schedule submit evaluate training pipeline vector search answer question document").split()
+
+
+def passages(count: int, length: int = 500):
+    rng = random.Random(0)
+    texts = []
+    for _ in range(count):
+        words = []
+        while sum(len(word) + 1 for word in words) < length:
+            words.append(rng.choice(WORDS))
+        texts.append(" ".join(words))
+    return texts
+
+
+def rss_mib() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def child(backend: str, threads: int, queries: int, chunks: int, batch_size: int):
+    start = time.perf_counter()
+    if backend == "torch":
+        import sentence_transformers  # noqa: F401  (pulls in torch)
+    else:
+        import onnxruntime  # noqa: F401
+        import tokenizers  # noqa: F401
+    imported = time.perf_counter()
+    from src.rag.embedding_backend import load_embedding_model
+    model = load_embedding_model(backend, threads)
+    loaded = time.perf_counter()
+
+    probes = [f"{QUESTIONS[i % len(QUESTIONS)]} ({i})" for i in range(queries)]
+    model.encode(probes[:4], batch_size=4)  # Warm up
+    latencies = []
+    for probe in probes:
+        begin = time.perf_counter()
+        model.encode([probe], batch_size=1)
+        latencies.append(time.perf_counter() - begin)
+
+    texts = passages(chunks)
+    begin = time.perf_counter()
+    model.encode(texts, batch_size=batch_size)
+    throughput = len(texts) / (time.perf_counter() - begin)
+
+    embeddings = model.encode(probes + texts[:64], batch_size=batch_size, normalize_embeddings=True)
+    print(json.dumps({
+        "import": imported - start,
+        "load": loaded - imported,
+        "rss": rss_mib(),
+        "query_ms": statistics.median(latencies) * 1000,
+        "throughput": throughput,
+        "embeddings": np.asarray(embeddings, dtype=np.float32).tolist(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--threads", type=int, default=0, help="0 = runtime default")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.threads, args.queries, args.chunks, args.batch_size)
+        return
+
+    backends = ["torch"] + [backend for backend in args.backends if backend != "torch"]
+    results = {}
+    for backend in backends:
+        if backend != "torch":
+            subprocess.run([sys.executable, "-m", "src.rag.embedding_backend", backend], check=True)
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_embedding_backends", "--child", backend,
+             "--threads", str(args.threads), "--queries", str(args.queries), "--chunks", str(args.chunks),
+             "--batch-size", str(args.batch_size)],
+            check=True, capture_output=True, text=True, env={**os.environ, "EMBEDDING_BACKEND": backend}
+        ).stdout
+        results[backend] = json.loads(output.strip().splitlines()[-1])
+
+    reference = np.array(results["torch"]["embeddings"])
+    print(f"{'backend':<10} {'import s':>9} {'load s':>7} {'RSS MiB':>8} {'query ms':>9} {'chunks/s':>9} {'parity':>7}")
+    for backend in backends:
+        if backend not in args.backends:
+            continue
+        result = results[backend]
+        similarity = float(np.min(np.sum(np.array(result["embeddings"]) * reference, axis=1)))
+        print(f"{backend:<10} {result['import']:9.2f} {result['load']:7.2f} {result['rss']:8.0f} "
+              f"{result['query_ms']:9.2f} {result['throughput']:9.0f} {similarity:7.4f}")
+
+
+if __name__ == "__main__":
+    main()
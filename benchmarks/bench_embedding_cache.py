@@ -0,0 +1,76 @@
+"""
+Embedding cache benchmark: memory-mapped EmbeddingCache vs a pickled dict.
+
+Fills both with synthetic 384-d embeddings, then times opening the cache
+and looking up a batch of cached chunks.
+
+    python -m benchmarks.bench_embedding_cache --entries 1000000
+"""
+import argparse
+import pickle
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.rag.embedding_cache import EmbeddingCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--dtype", default="float32")
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--skip-pickle", action="store_true")
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="rag-embcache-"))
+    rng = np.random.default_rng(0)
+    texts = [f"synthetic chunk {i}" for i in range(args.entries)]
+    try:
+        cache = EmbeddingCache(work_dir / "store", "bench-model", args.dimension,
+                               dtype=args.dtype, max_entries=args.entries)
+        start = time.perf_counter()
+        for i in range(0, args.entries, 100_000):
+            batch = texts[i:i + 100_000]
+            cache.put_many(batch, rng.standard_normal((len(batch), args.dimension), dtype=np.float32))
+            cache.flush()
+        print(f"EmbeddingCache fill:   {time.perf_counter() - start:8.2f}s")
+
+        sample = [texts[i] for i in rng.integers(0, args.entries, args.lookups)]
+
+        start = time.perf_counter()
+        cache = EmbeddingCache(work_dir / "store", "bench-model", args.dimension,
+                               dtype=args.dtype, max_entries=args.entries)
+        open_time = time.perf_counter() - start
+        start = time.perf_counter()
+        _, missing = cache.get_many(sample)
+        lookup_time = time.perf_counter() - start
+        assert not missing
+        size = sum(f.stat().st_size for f in (work_dir / "store").iterdir())
+        print(f"EmbeddingCache open:   {open_time * 1000:8.2f}ms   "
+              f"{args.lookups} lookups: {lookup_time * 1000:8.2f}ms   on disk: {size / 1e6:8.1f}MB")
+
+        if args.skip_pickle:
+            return
+
+        legacy = {text: rng.standard_normal(args.dimension).tolist() for text in texts}
+        pickle_file = work_dir / "embeddings_cache.pkl"
+        with open(pickle_file, 'wb') as f:
+            pickle.dump(legacy, f)
+        del legacy
+        start = time.perf_counter()
+        with open(pickle_file, 'rb') as f:
+            legacy = pickle.load(f)
+        open_time = time.perf_counter() - start
+        print(f"pickle dict open:      {open_time * 1000:8.2f}ms   "
+              f"on disk: {pickle_file.stat().st_size / 1e6:8.1f}MB")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
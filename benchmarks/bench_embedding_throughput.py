@@ -0,0 +1,54 @@
+"""
+Embedding throughput benchmark (chunks/sec vs batch size).
+
+Chunks the bundled docs/ corpus and replicates it up to --chunks, then
+encodes it with DocumentLoader.generate_embeddings at several batch
+sizes, with and without length sorting. The per-chunk path that the
+loader used before is measured on a small sample for reference.
+
+    python -m benchmarks.bench_embedding_throughput --chunks 100000
+"""
+import argparse
+import time
+from pathlib import Path
+
+from src.rag import ingest
+from src.rag.agent import DocumentLoader
+
+
+def corpus_chunks(loader: DocumentLoader, total: int):
+    docs_path = Path(loader.docs_dir)
+    sources = [(path.relative_to(docs_path).as_posix(), path) for path in loader.discover_files()]
+    base = [chunk for _, chunk, _ in ingest.iter_chunks(sources)]
+    return [base[i % len(base)] for i in range(total)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 64, 256, 1024])
+    parser.add_argument("--single-sample", type=int, default=500)
+    args = parser.parse_args()
+
+    loader = DocumentLoader()
+    chunks = corpus_chunks(loader, args.chunks)
+    print(f"{len(chunks)} chunks")
+
+    sample = chunks[:args.single_sample]
+    start = time.perf_counter()
+    for chunk in sample:
+        loader.embedding_model.encode(chunk, convert_to_tensor=False)
+    elapsed = time.perf_counter() - start
+    print(f"{'one encode per chunk':<28} {len(sample) / elapsed:10.1f} chunks/s")
+
+    for batch_size in args.batch_sizes:
+        for sort_by_length in (False, True):
+            start = time.perf_counter()
+            embeddings = loader.generate_embeddings(chunks, batch_size=batch_size, sort_by_length=sort_by_length)
+            elapsed = time.perf_counter() - start
+            label = f"batch={batch_size}{' sorted' if sort_by_length else ''}"
+            print(f"{label:<28} {len(chunks) / elapsed:10.1f} chunks/s   {embeddings.dtype} {embeddings.shape}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+LLMClient under injected faults: hedging, retries and model fallback.
+
+Runs --requests completions (--concurrency at a time) through LLMClient
+against the local stub server, once per scenario:
+
+    tail      --slow-rate of requests take --slow-ms longer; without and with hedging
+    flaky     --error-rate of requests fail with a 503 and are retried
+    primary   the primary model always fails; answers come from the fallback
+              and its circuit breaker stops sending it traffic
+
+    python -m benchmarks.bench_llm_resilience --requests 400 --slow-rate 0.05 --slow-ms 3000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.stub_llm import StubLLM, start_stub_server
+from src.rag.llm_client import LLMClient
+
+PRIMARY = "stub/primary"
+FALLBACK = "stub/fallback"
+
+
+async def run(client: LLMClient, requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+    kwargs = {"messages": [{"role": "user", "content": "How long is the bootcamp?"}], "max_tokens": 64}
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await client.acomplete(kwargs)
+            except Exception:
+                failures += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies, failures
+
+
+def report(name: str, latencies, failures: int, stub: StubLLM):
+    latencies = sorted(latencies) or [float("nan")]
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    by_model = ", ".join(f"{model.split('/')[-1]}={count}" for model, count in sorted(stub.requests_by_model.items()))
+    print(f"{name:<16} {statistics.median(latencies) * 1000:8.0f} {p99 * 1000:8.0f} {failures:8d} "
+          f"{stub.requests:9d}  {by_model}")
+
+
+def reset(stub: StubLLM, **faults):
+    stub.error_rate = faults.get("error_rate", 0.0)
+    stub.slow_rate = faults.get("slow_rate", 0.0)
+    stub.slow_ms = faults.get("slow_ms", 0.0)
+    stub.fail_models = set(faults.get("fail_models", ()))
+    stub.requests = stub.errors = 0
+    stub.requests_by_model = {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-ms", type=float, default=3000.0)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--retry-delay", type=float, default=0.1)
+    parser.add_argument("--port", type=int, default=8083)
+    args = parser.parse_args()
+
+    stub = StubLLM(args.latency_ms, token_delay_ms=0)
+    base_url = start_stub_server(stub, port=args.port)
+
+    def client(hedge: bool = False) -> LLMClient:
+        return LLMClient([PRIMARY, FALLBACK], base_url=base_url, api_key="stub",
+                         retry_delay=args.retry_delay, hedge=hedge, hedge_min_delay=0.0)
+
+    async def scenarios():
+        print(f"{'scenario':<16} {'p50 ms':>8} {'p99 ms':>8} {'failed':>8} {'upstream':>9}  requests by model")
+        tail = {"slow_rate": args.slow_rate, "slow_ms": args.slow_ms}
+        for name, hedge in (("tail", False), ("tail + hedge", True)):
+            llm = client(hedge)
+            reset(stub)
+            await run(llm, 50, args.concurrency)  # Fill the latency window the hedge delay comes from
+            reset(stub, **tail)
+            report(name, *await run(llm, args.requests, args.concurrency), stub)
+
+        reset(stub, error_rate=args.error_rate)
+        report("flaky", *await run(client(), args.requests, args.concurrency), stub)
+
+        reset(stub, fail_models=[PRIMARY])
+        report("primary down", *await run(client(), args.requests, args.concurrency), stub)
+
+    asyncio.run(scenarios())
+
+
+if __name__ == "__main__":
+    main()
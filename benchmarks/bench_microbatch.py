@@ -0,0 +1,75 @@
+"""
+Retrieval throughput vs p99 latency under concurrent load, per batch window.
+
+Runs --clients closed-loop clients against QueryBatcher for --seconds
+at each window. "unbatched" is max_batch_size=1, i.e. one encode and one
+FAISS search per query, which is what aquery() did before batching.
+
+    python -m benchmarks.bench_microbatch --clients 64 --windows 0 2 5 10
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.config.settings import RETRIEVAL_WORKERS
+from src.rag.agent import DocumentLoader, Retriever
+from src.rag.batching import QueryBatcher
+from src.rag.index_store import IndexStore
+
+
+QUERIES = [
+    "How long is the bootcamp?",
+    "When is the next cohort starting?",
+    "What projects do interns build?",
+    "How do I submit my weekly assignment?",
+    "Is there a certificate at the end?",
+    "What is the time commitment per week?",
+    "Can I join if I am on OPT?",
+    "What does the AI engineer training cover?",
+]
+
+
+async def run_load(batcher: QueryBatcher, clients: int, seconds: float):
+    latencies = []
+    deadline = time.perf_counter() + seconds
+
+    async def client(offset: int):
+        i = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            # Unique text per request so the query caches do not absorb the load
+            await batcher.retrieve(f"{QUERIES[i % len(QUERIES)]} ({offset}-{i})", k=2)
+            latencies.append(time.perf_counter() - start)
+            i += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(clients)))
+    return len(latencies) / (time.perf_counter() - start), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 1, 2, 5, 10])
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args()
+
+    loader = DocumentLoader()
+    retriever = Retriever(loader, IndexStore().sync(loader))
+    executor = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS)
+
+    configs = [("unbatched", 1, 0.0)] + [(f"window={w:g}ms", args.max_batch, w) for w in args.windows]
+    print(f"{'config':<16} {'qps':>10} {'p50':>10} {'p99':>10}")
+    for label, max_batch, window in configs:
+        batcher = QueryBatcher(retriever, executor, max_batch_size=max_batch, max_wait_ms=window)
+        qps, latencies = asyncio.run(run_load(batcher, args.clients, args.seconds))
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        print(f"{label:<16} {qps:10.1f} {p50:8.2f}ms {p99:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
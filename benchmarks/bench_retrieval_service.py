@@ -0,0 +1,111 @@
+"""
+Retrieval service throughput as the number of worker processes grows.
+
+For each --workers count the service is started on its own port (building
+or loading the index from docs/ first), and once every worker answers
+/health, --clients closed-loop clients send single-query /search requests
+for --seconds. Every request text is unique so the query caches do not
+absorb the load. Afterwards each worker's /health reports its resident
+memory: RssFile holds the memory-mapped FAISS index, whose pages every
+worker shares, while RssAnon is private to the worker.
+
+    python -m benchmarks.bench_retrieval_service --workers 1 2 4 --clients 32
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+QUERIES = [
+    "How long is the bootcamp?",
+    "When is the next cohort starting?",
+    "What projects do interns build?",
+    "How do I submit my weekly assignment?",
+    "Is there a certificate at the end?",
+    "What is the time commitment per week?",
+    "Can I join if I am on OPT?",
+    "What does the AI engineer training cover?",
+]
+
+
+def wait_for_workers(url: str, workers: int, timeout: float) -> dict:
+    """Poll /health over fresh connections until every worker process has answered; returns health by pid."""
+    health = {}
+    deadline = time.time() + timeout
+    while len(health) < workers:
+        if time.time() > deadline:
+            raise TimeoutError(f"only {len(health)} of {workers} workers came up")
+        try:
+            result = httpx.get(f"{url}/health", timeout=1).json()
+            health[result["pid"]] = result
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    return health
+
+
+def run_load(url: str, clients: int, seconds: float, k: int):
+    deadline = time.perf_counter() + seconds
+
+    def client(offset: int):
+        latencies = []
+        with httpx.Client(base_url=url, timeout=30) as http:
+            i = 0
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = http.post("/search", json={"queries": [f"{QUERIES[i % len(QUERIES)]} ({offset}-{i})"], "k": k})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+                i += 1
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = [latency for result in pool.map(client, range(clients)) for latency in result]
+    return len(latencies) / (time.perf_counter() - start), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=1, help="torch/FAISS threads per worker")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8710)
+    parser.add_argument("--startup-timeout", type=float, default=600.0)
+    args = parser.parse_args()
+
+    rows = []
+    for workers in args.workers:
+        url = f"http://127.0.0.1:{args.port}"
+        service = subprocess.Popen(
+            [sys.executable, "-m", "src.rag.retrieval_service", "--port", str(args.port),
+             "--workers", str(workers), "--threads", str(args.threads)],
+            stdout=subprocess.DEVNULL
+        )
+        try:
+            wait_for_workers(url, workers, args.startup_timeout)
+            run_load(url, args.clients, 1.0, args.k)  # Warm up
+            qps, latencies = run_load(url, args.clients, args.seconds, args.k)
+            memory = [health["memory_mib"] for health in wait_for_workers(url, workers, args.startup_timeout).values()]
+        finally:
+            service.terminate()
+            service.wait()
+        latencies.sort()
+        rows.append((workers, qps, statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1],
+                     *(statistics.mean(worker.get(key, 0) for worker in memory)
+                       for key in ("VmRSS", "RssAnon", "RssFile"))))
+
+    print(f"{'workers':>8} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'speedup':>8} "
+          f"{'RSS MiB':>8} {'anon MiB':>9} {'file MiB':>9}")
+    for workers, qps, p50, p99, rss, anon, mapped in rows:
+        print(f"{workers:8d} {qps:10.1f} {p50 * 1000:8.1f} {p99 * 1000:8.1f} {qps / rows[0][1]:7.2f}x "
+              f"{rss:8.0f} {anon:9.0f} {mapped:9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Startup benchmark for the persistent index.
+
+Compares a cold boot (no saved index), a warm boot with no document
+changes and a warm boot after one file was edited. The bundled docs are
+replicated into a temporary corpus so the gap is visible.
+
+    python -m benchmarks.bench_startup --replicate 20
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from src.config.settings import DOCS_DIR, EMBEDDING_MODEL
+from src.rag.agent import DocumentLoader
+from src.rag.embedding_cache import EmbeddingCache
+from src.rag.index_store import IndexStore
+
+
+def build_corpus(target: Path, replicate: int):
+    sources = sorted(Path(DOCS_DIR).glob("*.txt"))
+    for copy in range(replicate):
+        for source in sources:
+            text = source.read_text(encoding="utf-8")
+            (target / f"{source.stem} ({copy}).txt").write_text(f"[copy {copy}]\n{text}", encoding="utf-8")
+
+
+def timed_sync(loader, index_dir: Path, cache_dir: Path) -> float:
+    # The embedding cache would hide re-embedding cost, so every boot starts empty
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    loader.embedding_cache = EmbeddingCache(
+        cache_dir, EMBEDDING_MODEL, loader.embedding_model.get_sentence_embedding_dimension()
+    )
+    start = time.perf_counter()
+    store = IndexStore(index_dir).sync(loader)
+    elapsed = time.perf_counter() - start
+    print(f"  -> {len(store)} chunks")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--replicate", type=int, default=20)
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="rag-startup-"))
+    try:
+        docs_dir = work_dir / "docs"
+        index_dir = work_dir / "index"
+        cache_dir = work_dir / "embeddings"
+        docs_dir.mkdir()
+        build_corpus(docs_dir, args.replicate)
+
+        model_start = time.perf_counter()
+        loader = DocumentLoader(docs_dir=str(docs_dir), cache_dir=cache_dir)
+        model_time = time.perf_counter() - model_start
+
+        results = {"cold": timed_sync(loader, index_dir, cache_dir)}
+        results["warm, unchanged"] = timed_sync(loader, index_dir, cache_dir)
+
+        edited = next(docs_dir.glob("*.txt"))
+        edited.write_text(edited.read_text(encoding="utf-8") + "\nOne more paragraph.\n", encoding="utf-8")
+        results["warm, one file changed"] = timed_sync(loader, index_dir, cache_dir)
+
+        print(f"\nmodel load (all boots): {model_time:.2f}s")
+        for name, seconds in results.items():
+            print(f"{name:<24} {seconds:8.2f}s")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Local OpenAI-compatible chat completions server for offline benchmarks.
+
+Run standalone with ``python -m benchmarks.stub_llm --port 8081 --latency-ms 500``
+or start it in-process with ``start_stub_server()``.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+import uuid
+
+from aiohttp import web
+
+
+class StubLLM:
+    """
+    latency_ms is the time to the first token (or to the whole answer when
+    not streaming); token_delay_ms spaces out streamed tokens.
+    prefill_ms_per_1k adds prompt processing time per 1000 prompt tokens
+    (estimated as 4 characters each), and max_tokens truncates the answer
+    word by word.
+
+    Faults for resilience testing: error_rate of requests (and every
+    request for a model in fail_models) get a 503, and slow_rate of them
+    take an extra slow_ms, e.g. a long value to simulate a hung upstream.
+    """
+
+    def __init__(self, latency_ms: float = 500.0, answer: str = "This is a stub answer from the local benchmark server.",
+                 token_delay_ms: float = 20.0, prefill_ms_per_1k: float = 0.0, error_rate: float = 0.0,
+                 slow_rate: float = 0.0, slow_ms: float = 0.0, fail_models=(), seed: int = 0):
+        self.latency_ms = latency_ms
+        self.answer = answer
+        self.token_delay_ms = token_delay_ms
+        self.prefill_ms_per_1k = prefill_ms_per_1k
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.fail_models = set(fail_models)
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.requests_by_model = {}
+        self.prompt_tokens = 0
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.requests += 1
+        model = body.get("model", "stub")
+        self.requests_by_model[model] = self.requests_by_model.get(model, 0) + 1
+        if model in self.fail_models or self.random.random() < self.error_rate:
+            self.errors += 1
+            return web.json_response({"error": {"message": "injected failure", "code": 503}}, status=503)
+
+        prompt_tokens = sum(len(message.get("content") or "") for message in body.get("messages", [])) // 4
+        self.prompt_tokens += prompt_tokens
+        delay_ms = self.latency_ms + prompt_tokens / 1000 * self.prefill_ms_per_1k
+        if self.random.random() < self.slow_rate:
+            delay_ms += self.slow_ms
+        await asyncio.sleep(delay_ms / 1000)
+
+        tokens = re.findall(r"\S+\s*", self.answer)
+        max_tokens = body.get("max_tokens")
+        finish_reason = "stop"
+        if max_tokens is not None and len(tokens) > max_tokens:
+            tokens, finish_reason = tokens[:max_tokens], "length"
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                 "total_tokens": prompt_tokens + len(tokens)}
+
+        if body.get("stream"):
+            return await self._stream(request, body, tokens, finish_reason, usage)
+        return web.json_response({
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": finish_reason,
+            }],
+            "usage": usage,
+        })
+
+    async def _stream(self, request: web.Request, body: dict, tokens: list, finish_reason: str,
+                      usage: dict) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+        async def send(choices: list, **extra):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": choices,
+                **extra,
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+
+        def choice(delta: dict, reason=None) -> list:
+            return [{"index": 0, "delta": delta, "finish_reason": reason}]
+
+        await send(choice({"role": "assistant", "content": ""}))
+        for token in tokens:
+            await send(choice({"content": token}))
+            await asyncio.sleep(self.token_delay_ms / 1000)
+        await send(choice({}, finish_reason))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            await send([], usage=usage)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        return app
+
+
+def start_stub_server(stub: StubLLM, host: str = "127.0.0.1", port: int = 8081) -> str:
+    """Serve the stub on a daemon thread and return its OpenAI base URL."""
+    ready = threading.Event()
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(stub.make_app())
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, host, port).start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, name="stub-llm", daemon=True).start()
+    ready.wait()
+    return f"http://{host}:{port}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    parser.add_argument("--token-delay-ms", type=float, default=20.0)
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=0.0)
+    parser.add_argument("--fail-models", nargs="*", default=[])
+    args = parser.parse_args()
+    stub = StubLLM(args.latency_ms, token_delay_ms=args.token_delay_ms, prefill_ms_per_1k=args.prefill_ms_per_1k,
+                   error_rate=args.error_rate, slow_rate=args.slow_rate, slow_ms=args.slow_ms,
+                   fail_models=args.fail_models)
+    web.run_app(stub.make_app(), host=args.host, port=args.port)
@@ -0,0 +1,146 @@
+import time
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+from ..config.settings import *
+from ..utils.metrics import request_queue_depth, request_queue_wait, requests_rejected
+
+
+class TokenBucket:
+    """Allows `capacity` requests at once, refilled at `rate` requests per second."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available, 0 if one is available now."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class RateLimiter:
+    """
+    Token buckets per user and per guild.
+
+    A request needs a token from both its user's and its guild's bucket
+    (DMs only have the user bucket) and takes neither if one is empty.
+    Buckets that have refilled completely are dropped once more than
+    max_keys exist, since a fresh bucket behaves the same.
+    """
+
+    def __init__(self, user_rate: float = USER_RATE_PER_MINUTE, user_burst: int = USER_RATE_BURST,
+                 guild_rate: float = GUILD_RATE_PER_MINUTE, guild_burst: int = GUILD_RATE_BURST,
+                 max_keys: int = RATE_LIMIT_MAX_KEYS, clock: Callable[[], float] = time.monotonic):
+        self.limits = {"user": (user_rate / 60, user_burst), "guild": (guild_rate / 60, guild_burst)}
+        self.max_keys = max_keys
+        self.clock = clock
+        self.buckets: Dict[Tuple[str, int], TokenBucket] = {}
+
+    def _bucket(self, scope: str, key: int, now: float) -> TokenBucket:
+        bucket = self.buckets.get((scope, key))
+        if bucket is None:
+            bucket = self.buckets[(scope, key)] = TokenBucket(*self.limits[scope], now)
+        return bucket
+
+    def check(self, user_id: int, guild_id: Optional[int]) -> Optional[Tuple[str, float]]:
+        """Take a token and return None, or return the limited scope ("user"/"guild") and seconds to wait."""
+        now = self.clock()
+        if len(self.buckets) > self.max_keys:
+            self.buckets = {key: bucket for key, bucket in self.buckets.items() if not bucket.is_full(now)}
+
+        buckets = [("user", self._bucket("user", user_id, now))]
+        if guild_id is not None:
+            buckets.append(("guild", self._bucket("guild", guild_id, now)))
+        for scope, bucket in buckets:
+            wait = bucket.wait_time(now)
+            if wait > 0:
+                requests_rejected.labels(f"{scope}_rate").inc()
+                return scope, wait
+        for _, bucket in buckets:
+            bucket.take()
+        return None
+
+
+Job = Callable[[], Awaitable[None]]
+
+
+class FairQueue:
+    """
+    Bounded request queue in front of the RAG agent, fair across guilds.
+
+    Each guild (or DM user) has its own FIFO; `workers` tasks serve the
+    guilds with waiting requests in round-robin order, so a busy guild
+    only delays others by one request per turn. Requests are shed when
+    the queue holds max_size requests or the guild already has
+    max_per_key waiting.
+    """
+
+    def __init__(self, workers: int = REQUEST_QUEUE_WORKERS, max_size: int = REQUEST_QUEUE_SIZE,
+                 max_per_key: int = REQUEST_QUEUE_PER_GUILD):
+        self.workers = workers
+        self.max_size = max_size
+        self.max_per_key = max_per_key
+        self.queues: Dict[Hashable, Deque[Tuple[Job, float, asyncio.Future]]] = {}
+        self.turns: Deque[Hashable] = deque()  # Keys with waiting requests, in serving order
+        self.size = 0
+        self._available: Optional[asyncio.Semaphore] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        if not self._tasks:
+            self._available = asyncio.Semaphore(0)
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, key: Hashable, job: Job) -> Optional[asyncio.Future]:
+        """Queue job under key; the future resolves when it has run. None if the request was shed."""
+        queue = self.queues.get(key)
+        if self.size >= self.max_size or (queue is not None and len(queue) >= self.max_per_key):
+            requests_rejected.labels("queue_full").inc()
+            return None
+        if queue is None:
+            queue = self.queues[key] = deque()
+            self.turns.append(key)
+        future = asyncio.get_running_loop().create_future()
+        queue.append((job, time.monotonic(), future))
+        self.size += 1
+        request_queue_depth.set(self.size)
+        self._available.release()
+        return future
+
+    def _next(self) -> Tuple[Job, float, asyncio.Future]:
+        key = self.turns.popleft()
+        queue = self.queues[key]
+        item = queue.popleft()
+        if queue:
+            self.turns.append(key)
+        else:
+            del self.queues[key]
+        self.size -= 1
+        request_queue_depth.set(self.size)
+        return item
+
+    async def _worker(self):
+        while True:
+            await self._available.acquire()
+            job, queued_at, future = self._next()
+            request_queue_wait.observe(time.monotonic() - queued_at)
+            try:
+                await job()
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(None)
@@ -0,0 +1,100 @@
+import re
+import asyncio
+from typing import Awaitable, Callable, Iterable, List, Set, Tuple
+import discord
+from discord import Embed, Colour
+
+EMBED_DESCRIPTION_LIMIT = 4096
+MESSAGE_EMBED_LIMIT = 10  # embeds per message
+MESSAGE_TEXT_LIMIT = 6000  # characters across all embeds of one message
+MIN_EMBED_LENGTH = 200  # rather start a new message than send an embed shorter than this
+
+# Boundaries in order of preference: paragraph, line, sentence, word
+_BOUNDARIES = [re.compile(r"\n\s*\n\s*"), re.compile(r"\n\s*"), re.compile(r"(?<=[.!?])\s+"), re.compile(r"\s+")]
+_LINK = re.compile(r"\[[^\]\n]*\]\([^)\s]*\)|<?https?://\S+")
+
+# Fire-and-forget work (reactions, feedback records); referenced here until it finishes
+background_tasks: Set[asyncio.Task] = set()
+
+
+def split_point(text: str, limit: int) -> Tuple[int, int]:
+    """
+    Where to cut text so the first part has at most limit characters:
+    returns the end of the first part and the start of the rest (the
+    whitespace in between is dropped). Prefers the last paragraph break,
+    then line break, sentence end and space in the second half of the
+    window, never cuts inside a link, and only cuts mid-word when nothing
+    else fits.
+    """
+    if len(text) <= limit:
+        return len(text), len(text)
+    links = [match.span() for match in _LINK.finditer(text, 0, limit + 2048)]
+
+    def allowed(cut: int) -> bool:
+        return cut > 0 and not any(start < cut < end for start, end in links)
+
+    for min_length in (limit // 2, 1):
+        for boundary in _BOUNDARIES:
+            cuts = [match.span() for match in boundary.finditer(text, 0, limit + 1)
+                    if match.start() >= min_length and allowed(match.start())]
+            if cuts:
+                return cuts[-1]
+    inside = [start for start, end in links if 0 < start < limit < end]
+    cut = inside[0] if inside else limit
+    return cut, cut
+
+
+def split_text(text: str, limit: int) -> List[str]:
+    parts = []
+    while text:
+        end, start = split_point(text, limit)
+        parts.append(text[:end])
+        text = text[start:]
+    return parts
+
+
+def pack_embeds(text: str, embed_limit: int = EMBED_DESCRIPTION_LIMIT, max_embeds: int = MESSAGE_EMBED_LIMIT,
+                message_limit: int = MESSAGE_TEXT_LIMIT) -> List[List[str]]:
+    """Split text into embed descriptions, grouped into as few messages as Discord's limits allow."""
+    messages: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    while text:
+        room = min(embed_limit, message_limit - used)
+        if current and (len(current) == max_embeds or room < min(len(text), MIN_EMBED_LENGTH)):
+            messages.append(current)
+            current, used = [], 0
+            continue
+        end, start = split_point(text, room)
+        current.append(text[:end])
+        used += end
+        text = text[start:]
+    if current:
+        messages.append(current)
+    return messages
+
+
+async def send_embeds(send: Callable[..., Awaitable[discord.Message]], text: str) -> List[discord.Message]:
+    """Send text as blue embeds in the fewest messages; returns the messages."""
+    return [
+        await send(embeds=[Embed(description=description, color=Colour.blue()) for description in descriptions])
+        for descriptions in pack_embeds(text)
+    ]
+
+
+async def add_reactions(message: discord.Message, emojis: Iterable[str]):
+    """Add the reactions concurrently; a failed reaction (e.g. missing permission) is skipped."""
+    await asyncio.gather(*(message.add_reaction(emoji) for emoji in emojis), return_exceptions=True)
+
+
+def run_in_background(coro: Awaitable) -> asyncio.Task:
+    task = asyncio.ensure_future(coro)
+    background_tasks.add(task)
+    task.add_done_callback(_finished)
+    return task
+
+
+def _finished(task: asyncio.Task):
+    background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Background task failed: {task.exception()}")
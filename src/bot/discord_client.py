@@ -1,30 +1,50 @@
 import os
+import math
 import time
 import discord
 from dotenv import load_dotenv
 from aiohttp_socks import ProxyConnector
 import asyncio
 from ..utils.logger import setup_logger
-from ..rag.agent import RAGAgent
+from ..config.settings import STREAM_RESPONSES, STARTUP_QUEUE_TIMEOUT, DOCS_WATCH_INTERVAL
+from ..rag.docs_watcher import DocsWatcher
+from ..utils.health import start_metrics_server
+from ..utils.metrics import startup_phase_seconds
+from .warmup import AgentWarmup
+from .admission import RateLimiter, FairQueue
+from ..utils.tracing import span, trace_request
+from .streaming import StreamingReply
+from .delivery import send_embeds, add_reactions, run_in_background
+from ..rag.feedback_store import FeedbackStore
 from discord import app_commands, Embed, Colour
 import random
-from prometheus_client import start_http_server, Counter, Gauge
+from prometheus_client import Counter
 
 logger = setup_logger('rag_agent')
-rag_agent = RAGAgent()
+boot_time = time.monotonic()
+# The RAG agent is built in the background once the event loop runs
+warmup = AgentWarmup()
+# /ask requests pass the rate limiter, then wait their guild's turn in the queue
+rate_limiter = RateLimiter()
+request_queue = FairQueue()
+# Votes are stored against the answer's query and retrieved chunks
+feedback_store = FeedbackStore()
 
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
 
 request_count = Counter('request_count', 'Number of requests processed')
 error_count = Counter('error_count', 'Number of errors encountered')
-query_processing_latency = Gauge('query_processing_latency', 'Latency of query processing in ms')
 positive_feedback_count = Counter('positive_feedback_count', 'Number of positive feedback received')
 negative_feedback_count = Counter('negative_feedback_count', 'Number of negative feedback received') 
 
 
-start_http_server(9091)
-
+RATE_LIMITED_MESSAGES = {
+    "user": "⏳ You're asking questions faster than I can answer them. Please try again in {seconds} seconds.",
+    "guild": "⏳ This server has asked a lot of questions just now. Please try again in {seconds} seconds.",
+}
+QUEUE_FULL_MESSAGE = "🚦 I'm answering a lot of questions right now. Please try again in a minute!"
+FEEDBACK_VOTES = {"👍": 1, "👎": -1}
 
 CHAT_RESPONSES = [
     "Hi there! How can I help you today? 🙂",
@@ -36,6 +56,102 @@ intents = discord.Intents.default()
 intents.message_content = True
 intents.reactions = True
 
+
+# Answering /ask; module level so benchmarks can drive it with stand-in interactions
+async def stream_answer(rag_agent, ctx, query: str, on_retrieval=None):
+    if isinstance(ctx, discord.Interaction):
+        reply = StreamingReply(ctx.followup.send)
+    else:
+        reply = StreamingReply(ctx.channel.send)
+    await reply.start()
+    async for part in rag_agent.astream_query(query, on_retrieval):
+        await reply.feed(part)
+    return await reply.finish()
+
+
+async def send_notice(ctx, message: str):
+    if isinstance(ctx, discord.Interaction):
+        await ctx.followup.send(message, ephemeral=True)
+    else:
+        await ctx.channel.send(message)
+
+
+async def process_query(ctx, query: str):
+    request_count.inc()
+    user = ctx.user if isinstance(ctx, discord.Interaction) else ctx.author
+    try:
+        limited = rate_limiter.check(user.id, ctx.guild.id if ctx.guild else None)
+        if limited is not None:
+            scope, retry_after = limited
+            await send_notice(ctx, RATE_LIMITED_MESSAGES[scope].format(seconds=math.ceil(retry_after)))
+            return
+
+        # Queue briefly while the model and index are still loading
+        rag_agent = await warmup.wait(STARTUP_QUEUE_TIMEOUT)
+        if rag_agent is None:
+            await send_notice(ctx, "⏳ I'm still warming up my knowledge base. Please ask again in a minute!")
+            return
+
+        # Answered by a queue worker once it is this guild's turn
+        done = request_queue.submit(
+            ctx.guild.id if ctx.guild else f"dm:{user.id}",
+            lambda: answer_query(rag_agent, ctx, user, query)
+        )
+        if done is None:
+            await send_notice(ctx, QUEUE_FULL_MESSAGE)
+            return
+        await done
+
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        error_count.inc()
+        await send_notice(
+            ctx,
+            "Sorry, I encountered an error processing your request.\n"
+            "Please try again or ask more specifically."
+        )
+
+
+async def answer_query(rag_agent, ctx, user, query: str):
+    retrievals = []
+    with trace_request(user_id=user.id, query=query), span("end_to_end"):
+        if STREAM_RESPONSES:
+            response = await stream_answer(rag_agent, ctx, query, retrievals.append)
+        else:
+            answer = await rag_agent.aquery(query, on_retrieval=retrievals.append)
+            with span("discord_send"):
+                response = await send_answer(ctx, answer)
+
+    # Neither the vote reactions nor the feedback record hold up the next request
+    run_in_background(add_reactions(response, FEEDBACK_VOTES))
+    if retrievals:
+        retrieval = retrievals[0]
+        vector_store = rag_agent.vector_store
+        run_in_background(asyncio.to_thread(
+            feedback_store.record_answer, response.id, query, list(retrieval.ids),
+            [meta.source if meta is not None else None for meta in retrieval.metas],
+            vector_store.version if vector_store is not None else None,
+            user.id, ctx.guild.id if ctx.guild else None
+        ))
+
+
+async def send_answer(ctx, answer: str):
+    """Send the answer in as few messages as possible; returns the last one."""
+    if len(answer) < 100:
+        answer = (
+            "🤖 **Answer**\n"
+            f"{answer}\n\n"
+            "📚 **Sources**\n"
+            "- Context from knowledge base\n"
+            "🔗 **Related Links**\n"
+            "- [AI PM Bootcamp Playlist](https://youtube.com/playlist?list=example)"
+        )
+
+    send = ctx.followup.send if isinstance(ctx, discord.Interaction) else ctx.channel.send
+    messages = await send_embeds(send, answer)
+    return messages[-1]
+
+
 class RAGBot(discord.Client):
     def __init__(self):
         super().__init__(intents=intents)
@@ -54,10 +170,23 @@ class RAGBot(discord.Client):
             self._first_sync = False
 
 async def start_bot():
+    start_metrics_server(9091, lambda: warmup.ready)
     client = RAGBot()
+    warmup.start()
+    request_queue.start()
+
+    async def watch_docs():
+        rag_agent = await warmup.wait(None)
+        if rag_agent.index_store is None:
+            return  # The retrieval service watches the docs itself
+        await DocsWatcher(rag_agent).run()
+
+    if DOCS_WATCH_INTERVAL > 0:
+        run_in_background(watch_docs())
 
     @client.event
     async def on_ready():
+        startup_phase_seconds.labels("discord_ready").set(time.monotonic() - boot_time)
         print(f'✅ Bot ready: {client.user}')
 
     @client.event
@@ -71,94 +200,55 @@ async def start_bot():
 
     @client.event
     async def on_reaction_add(reaction, user):
-        if user == client.user:
+        vote = FEEDBACK_VOTES.get(str(reaction.emoji))
+        if user == client.user or reaction.message.author != client.user or vote is None:
             return
-            
-        if reaction.message.author == client.user:
-            if str(reaction.emoji) == '👍':
-                positive_feedback_count.inc()
-                await reaction.message.channel.send(f"Thank you for your positive feedback {user.mention}! 😊")
-                
-            elif str(reaction.emoji) == '👎':
-                negative_feedback_count.inc()
-                feedback_message = (
-                    f"I'm sorry my answer wasn't helpful {user.mention}!\n"
-                    "Please try asking your question more specifically or use the `/ask` command again."
-                )
-                await reaction.message.channel.send(feedback_message)
-
-    async def process_query(ctx, query: str):
-        request_count.inc()
-        start_time = time.time()
-        try:
-            answer = rag_agent.query(query)
-            
-            if len(answer) < 100:
-                answer = (
-                    "🤖 **Answer**\n"
-                    f"{answer}\n\n"
-                    "📚 **Sources**\n"
-                    "- Context from knowledge base\n"
-                    "🔗 **Related Links**\n"
-                    "- [AI PM Bootcamp Playlist](https://youtube.com/playlist?list=example)"
-                )
-            
-            if len(answer) <= 4096: 
-                embed = Embed(description=answer, color=Colour.blue())
-                if isinstance(ctx, discord.Interaction):
-                    response = await ctx.followup.send(embed=embed)
-                else:
-                    response = await ctx.channel.send(embed=embed)
-            else:
-                chunks = [answer[i:i+2000] for i in range(0, len(answer), 2000)]
-                for i, chunk in enumerate(chunks):
-                    if i == 0:
-                        embed = Embed(
-                            title=f"📚 Answer (Part {i+1}/{len(chunks)})",
-                            description=chunk,
-                            color=Colour.blue()
-                        )
-                        if isinstance(ctx, discord.Interaction):
-                            response = await ctx.followup.send(embed=embed)
-                        else:
-                            response = await ctx.channel.send(embed=embed)
-                    else:
-                        embed = Embed(
-                            description=chunk,
-                            color=Colour.blue()
-                        )
-                        if isinstance(ctx, discord.Interaction):
-                            await ctx.followup.send(embed=embed)
-                        else:
-                            await ctx.channel.send(embed=embed)
-            
-            await response.add_reaction("👍")
-            await response.add_reaction("👎")
-
-            end_time = time.time()
-            query_processing_latency.set((end_time - start_time) * 1000)
+        # Recorded silently, no reply in the channel
+        (positive_feedback_count if vote > 0 else negative_feedback_count).inc()
+        await asyncio.to_thread(feedback_store.record_vote, reaction.message.id, user.id, vote)
 
-        except Exception as e:
-            logger.error(f"Error: {str(e)}")
-            error_msg = (
-                "Sorry, I encountered an error processing your request.\n"
-                "Please try again or ask more specifically."
-            )
-            if isinstance(ctx, discord.Interaction):
-                await ctx.followup.send(error_msg, ephemeral=True)
-            else:
-                await ctx.channel.send(error_msg)
-            error_count.inc()
+    @client.event
+    async def on_reaction_remove(reaction, user):
+        vote = FEEDBACK_VOTES.get(str(reaction.emoji))
+        if user == client.user or reaction.message.author != client.user or vote is None:
+            return
+        await asyncio.to_thread(feedback_store.remove_vote, reaction.message.id, user.id, vote)
 
     @client.tree.command(name="ask", description="Ask a question")
     async def ask(interaction: discord.Interaction, question: str):
         await interaction.response.defer(thinking=True)
         await process_query(interaction, question)
 
+    @client.tree.command(name="reload", description="Re-index changed documents")
+    @app_commands.default_permissions(administrator=True)
+    async def reload(interaction: discord.Interaction):
+        await interaction.response.defer(thinking=True, ephemeral=True)
+        rag_agent = await warmup.wait(STARTUP_QUEUE_TIMEOUT)
+        if rag_agent is None:
+            await interaction.followup.send("⏳ Still warming up, the index is being built already.", ephemeral=True)
+            return
+        try:
+            changes = await rag_agent.areload()
+        except Exception as e:
+            logger.error(f"Reload error: {str(e)}")
+            await interaction.followup.send("❌ Reload failed, the previous index is still serving.", ephemeral=True)
+            return
+        if changes is None:
+            message = "⏳ A reload is already running."
+        else:
+            message = f"✅ Reloaded: {changes['indexed']} files indexed, {changes['removed']} removed."
+        await interaction.followup.send(message, ephemeral=True)
+
     @client.tree.command(name="help")
     async def help(interaction: discord.Interaction):
         embed = Embed(title="🤖 Help", color=Colour.green())
-        embed.add_field(name="Commands", value="/ask `<question>` - Ask a question\n/help - Show this message", inline=False)
+        embed.add_field(
+            name="Commands",
+            value="/ask `<question>` - Ask a question\n"
+                  "/reload - Re-index changed documents (administrators)\n"
+                  "/help - Show this message",
+            inline=False
+        )
         embed.add_field(name="Feedback", value="React with 👍 or 👎", inline=False)
         await interaction.response.send_message(embed=embed)
 
@@ -0,0 +1,73 @@
+import time
+from typing import Awaitable, Callable, List, Optional
+import discord
+from discord import Embed, Colour
+from ..config.settings import *
+from ..utils.tracing import span
+from .delivery import EMBED_DESCRIPTION_LIMIT, split_point
+
+CURSOR = " ▌"
+
+
+class StreamingReply:
+    """
+    Renders a streamed answer into Discord embeds as it arrives.
+
+    The visible message is edited at most once per edit_interval seconds
+    so a fast token stream does not exhaust Discord's edit rate limit.
+    When the text outgrows one embed, the current message is finalized at
+    a paragraph, sentence or word boundary (see split_point) and the rest
+    continues in a new message.
+    """
+
+    def __init__(self, send: Callable[..., Awaitable[discord.Message]],
+                 edit_interval: float = STREAM_EDIT_INTERVAL,
+                 limit: int = EMBED_DESCRIPTION_LIMIT - len(CURSOR)):
+        self.send = send
+        self.edit_interval = edit_interval
+        self.limit = limit
+        self.messages: List[discord.Message] = []
+        self.text = ""
+        self.base = 0  # Offset of the current message's first character
+        self._rendered: Optional[str] = None
+        self._last_edit = 0.0
+
+    @property
+    def message(self) -> discord.Message:
+        return self.messages[-1]
+
+    async def start(self):
+        with span("discord_send"):
+            self.messages.append(await self.send(embed=Embed(description="⏳ Thinking…", color=Colour.blue())))
+        self._last_edit = time.monotonic()
+
+    async def feed(self, part: str):
+        self.text += part
+        while len(self.text) - self.base > self.limit:
+            await self._roll_over()
+        if time.monotonic() - self._last_edit >= self.edit_interval:
+            await self._render(self.text[self.base:] + CURSOR)
+
+    async def finish(self) -> discord.Message:
+        """Render the final text and return the last message."""
+        await self._render(self.text[self.base:] or "…")
+        return self.message
+
+    async def _roll_over(self):
+        end, start = split_point(self.text[self.base:], self.limit)
+        await self._render(self.text[self.base:self.base + end])
+        self.base += start
+        self._rendered = None
+        with span("discord_send"):
+            self.messages.append(await self.send(
+                embed=Embed(description=self.text[self.base:self.base + self.limit] + CURSOR, color=Colour.blue())
+            ))
+        self._last_edit = time.monotonic()
+
+    async def _render(self, description: str):
+        if description == self._rendered:
+            return
+        with span("discord_send"):
+            await self.message.edit(embed=Embed(description=description, color=Colour.blue()))
+        self._rendered = description
+        self._last_edit = time.monotonic()
@@ -0,0 +1,57 @@
+import asyncio
+import time
+from typing import Callable, Optional, TYPE_CHECKING
+from ..utils.metrics import rag_ready, startup_phase_seconds
+
+if TYPE_CHECKING:
+    from ..rag.agent import RAGAgent
+
+
+def _build_agent():
+    # Importing the agent pulls in torch and sentence-transformers, so that
+    # happens on the worker thread too
+    from ..rag.agent import RAGAgent
+    return RAGAgent()
+
+
+class AgentWarmup:
+    """
+    Builds the RAGAgent on a worker thread so the bot can log in to the
+    gateway and sync commands while the model and index load.
+    """
+
+    def __init__(self, factory: Callable[[], "RAGAgent"] = _build_agent):
+        self.factory = factory
+        self.agent: Optional["RAGAgent"] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.agent is not None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._build())
+
+    async def _build(self) -> "RAGAgent":
+        start_time = time.monotonic()
+        rag_ready.set(0)
+        try:
+            agent = await asyncio.to_thread(self.factory)
+        except Exception as e:
+            print(f"RAG agent failed to start: {e}")
+            raise
+        startup_phase_seconds.labels("agent_total").set(time.monotonic() - start_time)
+        self.agent = agent
+        rag_ready.set(1)
+        return agent
+
+    async def wait(self, timeout: Optional[float]) -> Optional["RAGAgent"]:
+        """Return the agent, waiting up to timeout seconds (None = forever); None if still warming up."""
+        if self.agent is not None:
+            return self.agent
+        self.start()
+        try:
+            return await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            return None
@@ -6,27 +6,156 @@ from pathlib import Path
 load_dotenv()
 
 BASE_DIR = Path(__file__).parent
-CACHE_DIR = BASE_DIR / "cache"
-MODEL_CACHE_DIR = CACHE_DIR / "models"
-CACHE_FILE = CACHE_DIR / "embeddings_cache.pkl"
+CACHE_DIR = Path(os.getenv("CACHE_DIR", BASE_DIR / "cache"))
+MODEL_CACHE_DIR = Path(os.getenv("MODEL_CACHE_DIR", CACHE_DIR / "models"))
+EMBEDDING_CACHE_DIR = CACHE_DIR / "embeddings"
+INDEX_DIR = CACHE_DIR / "index"
+RESPONSE_CACHE_PATH = Path(os.getenv("RESPONSE_CACHE_PATH", CACHE_DIR / "responses.sqlite3"))
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 SITE_URL = os.getenv("SITE_URL")
 SITE_NAME = os.getenv("SITE_NAME")
-OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
 
 EMBEDDING_MODEL = 'paraphrase-MiniLM-L3-v2'
 LLM_MODEL = "deepseek/deepseek-r1-0528-qwen3-8b:free"
 
-DOCS_DIR = "docs"
+# Embedding backend: "torch", or "onnx" / "onnx-int8" for ONNX Runtime (requirements-onnx.txt)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))  # intra-op threads, 0 = runtime default
+EMBEDDING_QUANTIZATION = "avx2"  # int8 kernels: arm64, avx2, avx512 or avx512_vnni
+EMBEDDING_PARITY_MIN = 0.98  # lowest cosine similarity to the torch embeddings an export may have
+
+EMBEDDING_CACHE_DTYPE = "float32"  # or "float16" to halve the cache size
+EMBEDDING_CACHE_MAX_ENTRIES = 1_000_000
+EMBEDDING_BATCH_SIZE = 256
+EMBEDDING_SORT_BY_LENGTH = True
+
+DOCS_DIR = os.getenv("DOCS_DIR", "docs")
 CHUNK_SIZE = 500
 CHUNK_OVERLAP = 50
 
-MAX_TOKENS = 150
-MAX_CONTEXT_LENGTH = 7000 
-DEFAULT_TOP_K = 2
+# Ingestion: files are read in blocks, chunked on a process pool past a size
+# threshold, and embedded/indexed a batch at a time
+INGEST_BLOCK_CHARS = 1 << 20
+INGEST_WORKERS = min(4, max(1, (os.cpu_count() or 2) - 1))
+INGEST_PARALLEL_MIN_BYTES = 8 << 20
+INGEST_BATCH_SIZE = 4096
+INGEST_TRAIN_SAMPLE = 100_000  # vectors buffered to train IVF quantizers before the first add
+INGEST_CACHE_FLUSH_CHUNKS = 50_000  # new embeddings buffered before the embedding cache is flushed
+
+# Vector index: "auto" picks flat / hnsw / ivf_pq by corpus size
+INDEX_TYPE = "auto"
+INDEX_AUTO_FLAT_MAX = 100_000
+INDEX_AUTO_HNSW_MAX = 2_000_000
+IVF_NLIST = 0  # 0 = about 4 * sqrt(corpus size)
+IVF_NPROBE = 16
+PQ_M = 48  # sub-quantizers, must divide the embedding dimension
+PQ_NBITS = 8
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# Hybrid retrieval: BM25 and vector candidates merged with reciprocal-rank fusion
+HYBRID_SEARCH = True
+HYBRID_CANDIDATES = 20  # candidates taken from each retriever before fusion
+RRF_K = 60
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Completion limit; reasoning models spend part of it on hidden reasoning tokens
+MAX_TOKENS = 1024
+DEFAULT_TOP_K = 4  # candidates handed to the context packer
+
+# Retrieved chunks are packed into this many prompt tokens, counted with the LLM's tokenizer
+CONTEXT_TOKEN_BUDGET = 600
+CONTEXT_TOKENIZER = "deepseek-ai/DeepSeek-R1-0528-Qwen3-8B"
+CONTEXT_TOKEN_CACHE_SIZE = 50_000
+
+# LLM client: pooled connections with explicit timeouts, MAX_RETRIES attempts
+# per model with jittered exponential backoff, then the next model in
+# LLM_FALLBACK_MODELS (comma-separated). A model failing LLM_BREAKER_FAILURES
+# times in a row is skipped for LLM_BREAKER_RESET seconds
+LLM_FALLBACK_MODELS = [model for model in os.getenv("LLM_FALLBACK_MODELS", "").split(",") if model]
+LLM_CONNECT_TIMEOUT = 5
+LLM_READ_TIMEOUT = 60
+LLM_MAX_CONNECTIONS = 64
 MAX_RETRIES = 3
-RETRY_DELAY = 2
+RETRY_DELAY = 2  # backoff base in seconds
+RETRY_MAX_DELAY = 20
+LLM_BREAKER_FAILURES = 5
+LLM_BREAKER_RESET = 30
+
+# Hedging: send a duplicate request once the first has taken longer than the
+# model's recent LLM_HEDGE_QUANTILE latency and keep whichever answers first
+# (non-streaming answers only: needs STREAM_RESPONSES=0)
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_QUANTILE = 0.95
+LLM_HEDGE_MIN_SAMPLES = 20
+LLM_HEDGE_MIN_DELAY = 1.0
+LLM_LATENCY_WINDOW = 200
+
+# Write per-request span timings to logs/rag_trace.log
+TRACE_REQUESTS = os.getenv("TRACE_REQUESTS", "0") == "1"
+
+# Stream answers into Discord, editing the reply at most once per interval
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "1") == "1"
+STREAM_EDIT_INTERVAL = 1.2
+
+# Poll docs/ for changes every this many seconds and hot-reload the index (0 = off)
+DOCS_WATCH_INTERVAL = 30
+
+# /ask waits this long for a still-loading agent before answering "warming up"
+STARTUP_QUEUE_TIMEOUT = 20
+
+# /ask admission: token buckets per user and per guild (requests per minute, burst),
+# then a bounded queue served round-robin across guilds
+USER_RATE_PER_MINUTE = 6
+USER_RATE_BURST = 3
+GUILD_RATE_PER_MINUTE = 60
+GUILD_RATE_BURST = 20
+RATE_LIMIT_MAX_KEYS = 100_000
+REQUEST_QUEUE_SIZE = 200
+REQUEST_QUEUE_PER_GUILD = 25
+
+QUERY_CONCURRENCY = 32
+REQUEST_QUEUE_WORKERS = QUERY_CONCURRENCY  # queued requests answered at once
+RETRIEVAL_WORKERS = 4
+# Queries arriving within this window are encoded and searched together
+RETRIEVAL_BATCH_WINDOW_MS = 2
+RETRIEVAL_MAX_BATCH = 32
+
+# Standalone retrieval service (python -m src.rag.retrieval_service): worker
+# processes sharing one memory-mapped index behind a single socket. Set
+# RETRIEVAL_SERVICE_URL (http://host:port or unix:///path/to.sock) to make the
+# bot query it instead of loading the embedding model and index itself
+RETRIEVAL_SERVICE_URL = os.getenv("RETRIEVAL_SERVICE_URL")
+RETRIEVAL_SERVICE_HOST = "127.0.0.1"
+RETRIEVAL_SERVICE_PORT = 8700
+RETRIEVAL_SERVICE_WORKERS = 2
+RETRIEVAL_SERVICE_THREADS = 1  # torch/FAISS threads per worker process
+RETRIEVAL_SERVICE_TIMEOUT = 10
+RETRIEVAL_SERVICE_RELOAD_INTERVAL = 2  # workers check for a newly saved index this often
+# A worker exiting within RETRIEVAL_SERVICE_MIN_UPTIME seconds of its start counts as a failed
+# start; restarts back off exponentially and the service stops after too many in a row
+RETRIEVAL_SERVICE_MIN_UPTIME = 60
+RETRIEVAL_SERVICE_MAX_FAILED_STARTS = 5
+RETRIEVAL_SERVICE_RESTART_MAX_DELAY = 60
+
+# Query embedding and retrieval result caches (entries, seconds)
+QUERY_EMBEDDING_CACHE_SIZE = 10_000
+QUERY_EMBEDDING_CACHE_TTL = 24 * 3600
+RETRIEVAL_CACHE_SIZE = 10_000
+RETRIEVAL_CACHE_TTL = 3600
+
+# LLM response cache; RESPONSE_CACHE_PATH can point at a volume shared by replicas
+RESPONSE_CACHE_MAX_ENTRIES = 50_000
+RESPONSE_CACHE_SEMANTIC = False  # also reuse answers to near-identical questions
+RESPONSE_CACHE_SIMILARITY = 0.95  # minimum cosine similarity for a semantic hit
+
+# 👍/👎 votes on answers, stored with the query and retrieved chunk IDs
+FEEDBACK_DB_PATH = Path(os.getenv("FEEDBACK_DB_PATH", CACHE_DIR / "feedback.sqlite3"))
+FEEDBACK_MAX_ANSWERS = 200_000
 
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 
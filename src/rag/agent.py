@@ -1,160 +1,202 @@
-from sentence_transformers import SentenceTransformer
 import os
-from typing import List, Tuple, Dict
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from typing import List, Tuple, Dict, NamedTuple, Optional, AsyncIterator, Callable
 from pathlib import Path
 import numpy as np
-import faiss
-import pickle
 import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from ..config.settings import *
-from openai import OpenAI
-import re
-from urlextract import URLExtract
+from .embedding_cache import EmbeddingCache
+from .embedding_backend import load_embedding_model
+from .vector_store import VectorStore
+from .index_store import IndexStore
+from .batching import QueryBatcher
+from .query_cache import QueryCache
+from .response_cache import ResponseCache
+from .bm25_index import reciprocal_rank_fusion
+from .chunk_meta import ChunkMeta
+from . import ingest
+from .context_packer import ContextPacker
+from .llm_client import LLMClient
+from ..utils.metrics import (
+    cache_hits, cache_misses, llm_time_to_first_token, llm_tokens, startup_phase_seconds,
+    index_reload_seconds, index_reloads, index_version
+)
+from ..utils.tracing import span, record
 
 class DocumentLoader:
-    def __init__(self, docs_dir: str = DOCS_DIR, cache_file: str = CACHE_FILE):
+    def __init__(self, docs_dir: str = DOCS_DIR, cache_dir: Optional[Path] = EMBEDDING_CACHE_DIR,
+                 embedding_model=None):
         self.docs_dir = docs_dir
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP
-        )
-        self.embeddings = []
-        
+
         # Create cache directory
         os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
         
         # Initialize sentence transformer
-        print("Loading sentence transformer model...")
-        self.embedding_model = SentenceTransformer(
-            EMBEDDING_MODEL,
-            cache_folder=MODEL_CACHE_DIR
-            )
+        if embedding_model is None:
+            print(f"Loading sentence transformer model ({EMBEDDING_BACKEND} backend)...")
+            embedding_model = load_embedding_model()
+        self.embedding_model = embedding_model
         
-        self.cache_file = cache_file
-        self.embedding_cache = self._load_cache()
-        print("Sentence transformer model loaded!")
+        self.cache_dir = cache_dir
+        if cache_dir is None:
+            # Query-only loaders (retrieval service workers) never embed chunks
+            self.embedding_cache = None
+            print("Sentence transformer model loaded!")
+            return
+        self.embedding_cache = EmbeddingCache(
+            cache_dir,
+            model_name=EMBEDDING_MODEL,
+            dimension=self.embedding_model.get_sentence_embedding_dimension(),
+            dtype=EMBEDDING_CACHE_DTYPE,
+            max_entries=EMBEDDING_CACHE_MAX_ENTRIES
+        )
+        print(f"Sentence transformer model loaded! ({len(self.embedding_cache)} cached embeddings)")
 
-    def _load_cache(self) -> Dict[str, List[float]]:
-        """Load cached embeddings if they exist."""
-        try:
-            with open(self.cache_file, 'rb') as f:
-                return pickle.load(f)
-        except FileNotFoundError:
-            return {}
+    def generate_embedding(self, text: str) -> np.ndarray:
+        """Generate embedding using sentence-transformers."""
+        return self.generate_embeddings([text])[0]
 
-    def _save_cache(self):
-        """Save embeddings cache to disk."""
-        with open(self.cache_file, 'wb') as f:
-            pickle.dump(self.embedding_cache, f)
+    def generate_embeddings(self, texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE,
+                            sort_by_length: bool = EMBEDDING_SORT_BY_LENGTH) -> np.ndarray:
+        """
+        Encode texts in large batches and return a float32 (n, dim) array.
 
-    def generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding using sentence-transformers."""
-        try:
-            # Convert to numpy array and then to list
-            embedding = self.embedding_model.encode(text, convert_to_tensor=False)
-            return embedding.tolist()
-        except Exception as e:
-            print(f"Error generating embedding: {e}")
-            return [hash(text) % 1024 for _ in range(384)]  # MiniLM uses 384 dimensions
+        Sorting by length groups similarly sized chunks into the same batch,
+        which keeps tokenizer padding (and wasted compute) to a minimum.
+        Encoder errors propagate: there is no stand-in vector that would
+        not end up in the embedding cache, the index or the query cache.
+        """
+        dimension = self.embedding_model.get_sentence_embedding_dimension()
+        embeddings = np.empty((len(texts), dimension), dtype=np.float32)
+        order = np.argsort([-len(t) for t in texts], kind='stable') if sort_by_length else np.arange(len(texts))
+
+        for start in range(0, len(texts), batch_size):
+            batch_ids = order[start:start + batch_size]
+            batch = [texts[i] for i in batch_ids]
+            embeddings[batch_ids] = self.embedding_model.encode(
+                batch,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+        return embeddings
 
-    def load_and_chunk_documents(self) -> Tuple[List[str], List[List[float]]]:
-        start_time = time.time()
-        chunks = []
-        embeddings = []
-        docs_path = Path(self.docs_dir)
-
-        print(f"\n{'=' * 50}\nStarting document loading process...")
-
-        # First, collect all chunks
-        files_found = list(docs_path.glob("*.txt"))
-        print(f"Found {len(files_found)} text files in {self.docs_dir}")
-
-        for file_path in files_found:
-            print(f"\nProcessing file: {file_path}")
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-                new_chunks = self.text_splitter.split_text(content)
-                print(f"Generated {len(new_chunks)} chunks from file")
-                chunks.extend(new_chunks)
-
-        print(f"\nTotal chunks generated: {len(chunks)}")
-        print("Starting embedding generation...")
-
-        # Process chunks in batches
-        total_batches = len(chunks) // 5 + (1 if len(chunks) % 5 else 0)
-        for i in range(0, len(chunks), 5):
-            batch = chunks[i:i + 5]
-            print(f"\nProcessing batch {i // 5 + 1}/{total_batches}")
-            batch_embeddings = []
-
-            for chunk in batch:
-                if chunk in self.embedding_cache:
-                    print("✓ Using cached embedding")
-                    batch_embeddings.append(self.embedding_cache[chunk])
-                else:
-                    print("⚡ Generating new embedding")
-                    embedding = self.generate_embedding(chunk)
-                    self.embedding_cache[chunk] = embedding
-                    batch_embeddings.append(embedding)
-
-            embeddings.extend(batch_embeddings)
-
-        print(f"\nEmbedding generation complete. Total embeddings: {len(embeddings)}")
-        print(f"{'=' * 50}\n")
-        return chunks, embeddings
-
-
-class VectorStore:
-    def __init__(self, dimension: int = 384):  # MiniLM dimension
-        self.dimension = dimension
-        self.index = faiss.IndexFlatL2(dimension)  # L2 distance for similarity
-        self.texts = []  # Store original texts
-
-    def add_embeddings(self, texts: List[str], embeddings: List[List[float]]):
-        """Add embeddings to the FAISS index"""
-        embeddings_array = np.array(embeddings).astype('float32')
-        self.index.add(embeddings_array)
-        self.texts.extend(texts)
-
-    def search(self, query_embedding: List[float], k: int = 3) -> List[str]:
-        """Search for most similar documents"""
-        query_array = np.array([query_embedding]).astype('float32')
-        distances, indices = self.index.search(query_array, k)
-        return [self.texts[i] for i in indices[0]]
+    def discover_files(self) -> List[Path]:
+        """Return the document files that make up the knowledge base."""
+        return ingest.discover_files(self.docs_dir)
+
+    def embed_chunks(self, chunks: List[str], flush: bool = True) -> np.ndarray:
+        """
+        Embed chunks, reusing cached embeddings where possible.
+
+        With flush=False new embeddings stay buffered in the embedding
+        cache until the caller flushes it.
+        """
+        embeddings, missing = self.embedding_cache.get_many(chunks)
+        cache_hits.labels("embedding").inc(len(chunks) - len(missing))
+        cache_misses.labels("embedding").inc(len(missing))
+
+        if missing:
+            with span("index_embed"):
+                embeddings[missing] = self.generate_embeddings([chunks[i] for i in missing])
+            self.embedding_cache.put_many([chunks[i] for i in missing], embeddings[missing])
+            if flush:
+                self.embedding_cache.flush()
+        return embeddings
+
+
+class Retrieval(NamedTuple):
+    query_embedding: Optional[np.ndarray]
+    ids: List[int]
+    docs: List[str]
+    metas: List[Optional[ChunkMeta]]
+
+    def top(self, k: int) -> "Retrieval":
+        return Retrieval(self.query_embedding, self.ids[:k], self.docs[:k], self.metas[:k])
 
 
 class Retriever:
     def __init__(self, document_loader: DocumentLoader, vector_store: VectorStore):
         self.document_loader = document_loader
         self.vector_store = vector_store
+        self.cache = QueryCache()
 
     def retrieve(self, query: str, k: int = 3) -> List[str]:
         """
         Convert query to embedding and retrieve most relevant documents.
         """
-        try:
-            # Generate embedding for the query
-            query_embedding = self.document_loader.generate_embedding(query)
+        return self.retrieve_many([query], k=k)[0]
 
-            # Get most similar documents
-            relevant_docs = self.vector_store.search(query_embedding, k=k)
+    def retrieve_many(self, queries: List[str], k: int = 3) -> List[List[str]]:
+        """
+        Retrieve documents for several queries with one encode and one search call.
+        """
+        return [retrieval.docs for retrieval in self.search_many(queries, k=k)]
 
-            return relevant_docs
+    def search_many(self, queries: List[str], k: int = 3) -> List[Retrieval]:
+        """
+        Like retrieve_many(), but also return the query embeddings and chunk IDs.
+
+        Cached query embeddings and cached results for the current index
+        version skip the encode and the search respectively. With
+        HYBRID_SEARCH on, vector and BM25 candidates are merged with
+        reciprocal-rank fusion.
+        """
+        try:
+            vector_store = self.vector_store
+            index_version = vector_store.version
+
+            # Generate embeddings for all uncached queries at once
+            query_embeddings = [self.cache.get_embedding(query) for query in queries]
+            missing = [i for i, embedding in enumerate(query_embeddings) if embedding is None]
+            if missing:
+                with span("embed"):
+                    new_embeddings = self.document_loader.generate_embeddings(
+                        [queries[i] for i in missing], sort_by_length=False
+                    )
+                for i, embedding in zip(missing, new_embeddings):
+                    self.cache.put_embedding(queries[i], embedding)
+                    query_embeddings[i] = embedding
+
+            # Get most similar documents for the queries without cached results
+            results = [self.cache.get_results(embedding, k, index_version) for embedding in query_embeddings]
+            missing = [i for i, ids in enumerate(results) if ids is None]
+            if missing:
+                candidates = max(k, HYBRID_CANDIDATES) if HYBRID_SEARCH else k
+                with span("search"):
+                    found = vector_store.search_ids_many(
+                        np.stack([query_embeddings[i] for i in missing]),
+                        k=candidates, nprobe=IVF_NPROBE, ef_search=HNSW_EF_SEARCH
+                    )
+                if HYBRID_SEARCH:
+                    with span("sparse_search"):
+                        keyword_found = vector_store.sparse.search_many([queries[i] for i in missing], k=candidates)
+                    found = [
+                        reciprocal_rank_fusion([dense, sparse], k)
+                        for dense, sparse in zip(found, keyword_found)
+                    ]
+                for i, ids in zip(missing, found):
+                    self.cache.put_results(query_embeddings[i], k, index_version, ids)
+                    results[i] = ids
+
+            return [
+                Retrieval(embedding, ids, [vector_store.texts[i] for i in ids], [vector_store.meta.get(i) for i in ids])
+                for embedding, ids in zip(query_embeddings, results)
+            ]
         except Exception as e:
             print(f"Error in retrieval: {e}")
-            return []
+            return [Retrieval(None, [], [], []) for _ in queries]
 
 
 class Generator:
     def __init__(self):
-        self.client = OpenAI(
-            base_url=OPENROUTER_BASE_URL,
-            api_key=OPENROUTER_API_KEY
-        )
+        # Timeouts, retries, hedging and model fallback live in the client
+        self.llm = LLMClient()
         self.model = LLM_MODEL
-        self.response_cache = {}
-        self.max_retries = MAX_RETRIES
+        self.response_cache = ResponseCache(model=self.model)
+        self.max_tokens = MAX_TOKENS
 
     def construct_prompt(self, query: str, context: List[str]) -> str:
         """Construct a detailed prompt for the LLM."""
@@ -167,82 +209,255 @@ Context:
 
 Question: {query}"""
 
-    def generate(self, query: str, context: List[str]) -> str:
+    def _completion_kwargs(self, prompt: str) -> dict:
+        """Request arguments shared by the sync and async clients."""
+        return dict(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "You are a helpful assistant that answers questions based on given context."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=self.max_tokens,
+            extra_headers={
+                key: value for key, value in
+                (("HTTP-Referer", SITE_URL), ("X-Title", SITE_NAME))
+                if value
+            }
+        )
+
+    @staticmethod
+    def _record_usage(usage):
+        if usage is not None:
+            llm_tokens.labels("prompt").inc(usage.prompt_tokens or 0)
+            llm_tokens.labels("completion").inc(usage.completion_tokens or 0)
+
+    def generate(self, query: str, context: List[str], query_embedding: Optional[np.ndarray] = None) -> str:
         """Generate a response using OpenRouter API via OpenAI client."""
-        cache_key = (query, tuple(context))
-        if cache_key in self.response_cache:
+        cached = self.response_cache.get(query, context, query_embedding)
+        if cached is not None:
             print("Using cached response")
-            return self.response_cache[cache_key]
+            return cached
 
-        prompt = self.construct_prompt(query, context)
+        with span("prompt"):
+            prompt = self.construct_prompt(query, context)
 
-        for attempt in range(self.max_retries):
-            try:
-                print(f"Generation attempt {attempt + 1}/{self.max_retries}")
-                
-                completion = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are a helpful assistant that answers questions based on given context."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    extra_headers={
-                        "HTTP-Referer": SITE_URL,
-                        "X-Title": SITE_NAME
-                    }
-                )
-                
-                response = completion.choices[0].message.content
-                if response:
-                    print("Successfully generated response")
-                    self.response_cache[cache_key] = response
-                    return response
-                
-            except Exception as e:
-                print(f"Error in generation attempt {attempt + 1}: {str(e)}")
-                if attempt == self.max_retries - 1:
-                    return "I apologize, but I encountered an error while generating the response. Please try again."
-                time.sleep(RETRY_DELAY)
+        start_time = time.time()
+        try:
+            with span("llm"):
+                response = self.llm.complete(self._completion_kwargs(prompt), on_usage=self._record_usage)
+        except Exception as e:
+            print(f"Error in generation: {str(e)}")
+            return "I apologize, but I encountered an error while generating the response. Please try again."
 
-        return "I apologize, but I was unable to generate a response after multiple attempts."
+        print("Successfully generated response")
+        self.response_cache.put(query, context, response, time.time() - start_time, query_embedding)
+        return response
 
+    async def _acached(self, query: str, context: List[str], query_embedding: Optional[np.ndarray]) -> Optional[str]:
+        """The cached answer for agenerate() and astream(), looked up off the event loop."""
+        cached = await asyncio.to_thread(self.response_cache.get, query, context, query_embedding)
+        if cached is not None:
+            print("Using cached response")
+        return cached
+
+    async def agenerate(self, query: str, context: List[str], query_embedding: Optional[np.ndarray] = None) -> str:
+        """Async variant of generate() that never blocks the event loop."""
+        cached = await self._acached(query, context, query_embedding)
+        if cached is not None:
+            return cached
+
+        with span("prompt"):
+            prompt = self.construct_prompt(query, context)
 
-class RAGAgent:
-    def __init__(self):
-        print("\nInitializing RAG Agent...")
         start_time = time.time()
+        try:
+            with span("llm"):
+                response = await self.llm.acomplete(self._completion_kwargs(prompt), on_usage=self._record_usage)
+        except Exception as e:
+            print(f"Error in generation: {str(e)}")
+            return "I apologize, but I encountered an error while generating the response. Please try again."
 
-        print("1. Loading document loader...")
-        self.document_loader = DocumentLoader()
+        print("Successfully generated response")
+        await asyncio.to_thread(
+            self.response_cache.put, query, context, response, time.time() - start_time, query_embedding
+        )
+        return response
 
-        print("2. Processing documents and generating embeddings...")
-        self.chunks, self.embeddings = self.document_loader.load_and_chunk_documents()
+    async def astream(self, query: str, context: List[str],
+                      query_embedding: Optional[np.ndarray] = None) -> AsyncIterator[str]:
+        """
+        Stream the answer as it is generated.
 
-        print("3. Initializing vector store...")
-        self.vector_store = VectorStore()
-        print(f"Adding {len(self.embeddings)} embeddings to vector store...")
-        self.vector_store.add_embeddings(self.chunks, self.embeddings)
+        The client only retries or falls back while nothing has been
+        yielded yet; a stream that breaks midway ends with an error note.
+        """
+        cached = await self._acached(query, context, query_embedding)
+        if cached is not None:
+            yield cached
+            return
+
+        with span("prompt"):
+            prompt = self.construct_prompt(query, context)
+
+        parts = []
+        start_time = time.time()
+        try:
+            async for token in self.llm.astream(self._completion_kwargs(prompt), on_usage=self._record_usage):
+                if not parts:
+                    llm_time_to_first_token.observe(time.time() - start_time)
+                parts.append(token)
+                yield token
+        except Exception as e:
+            print(f"Error in streaming: {str(e)}")
+            if parts:
+                yield "\n\n*(The response was interrupted. Please try again.)*"
+            else:
+                yield "I apologize, but I encountered an error while generating the response. Please try again."
+            return
+
+        latency = time.time() - start_time
+        record("llm", latency)
+        print("Successfully streamed response")
+        await asyncio.to_thread(self.response_cache.put, query, context, "".join(parts), latency, query_embedding)
+
+
+class RAGAgent:
+    def __init__(self):
+        print("\nInitializing RAG Agent...")
+        start_time = time.time()
 
-        print("4. Setting up retriever and generator...")
-        self.retriever = Retriever(self.document_loader, self.vector_store)
+        # Embedding and FAISS search are CPU bound; aquery() runs them here
+        self.executor = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="rag-retrieval")
+
+        # The LLM tokenizer downloads/loads while the embedding model and index do
+        self.context_packer = ContextPacker()
+        tokenizer_ready = self.executor.submit(self._timed_phase, "tokenizer_load", lambda: self.context_packer.tokenizer)
+
+        self._reload_lock = threading.Lock()
+        if RETRIEVAL_SERVICE_URL:
+            # Shards and replicas share the retrieval service's model and index
+            from .retrieval_service import RemoteRetriever
+            print(f"1. Using retrieval service at {RETRIEVAL_SERVICE_URL}")
+            self.document_loader = self.index_store = self.vector_store = None
+            self.retriever = RemoteRetriever(RETRIEVAL_SERVICE_URL)
+        else:
+            print("1. Loading document loader...")
+            self.document_loader = self._timed_phase("model_load", DocumentLoader)
+
+            print("2. Loading vector index...")
+            self.index_store = IndexStore()
+
+            print("3. Embedding new or changed documents...")
+            self.vector_store = self._timed_phase("index_sync", lambda: self.index_store.sync(self.document_loader))
+            print(f"Vector store ready with {len(self.vector_store)} chunks")
+            index_version.set(self.vector_store.version)
+            self.retriever = Retriever(self.document_loader, self.vector_store)
+
+        print("4. Setting up generator...")
         self.generator = Generator()
+        tokenizer_ready.result()
 
-        self.max_context_length = MAX_CONTEXT_LENGTH
+        self.query_semaphore = asyncio.Semaphore(QUERY_CONCURRENCY)
+        # Concurrent queries share one encode + search pass
+        self.batcher = QueryBatcher(self.retriever, self.executor)
 
         print(f"Initialization complete! Time taken: {time.time() - start_time:.2f} seconds\n")
 
-    def extract_urls(self, text):
-        extractor = URLExtract()
-        urls = extractor.find_urls(text)
-        return list(set(urls)) 
+    def reload(self) -> Optional[Dict[str, int]]:
+        """
+        Re-index added, changed and deleted documents and swap the new index in.
+
+        The new VectorStore generation is built off to the side (reusing
+        cached embeddings) and published with a single attribute
+        assignment, so queries never wait on a lock: the Retriever reads
+        vector_store once per batch and in-flight queries finish on the
+        old generation. Returns the number of files indexed and removed,
+        or None if another reload is already running.
+        """
+        if self.index_store is None:
+            raise RuntimeError("The index is managed by the retrieval service")
+        if not self._reload_lock.acquire(blocking=False):
+            print("Reload already in progress")
+            return None
+        try:
+            start_time = time.time()
+            try:
+                vector_store = self.index_store.sync(self.document_loader)
+            except Exception:
+                index_reloads.labels("error").inc()
+                raise
+            changes = self.index_store.last_changes
+            if changes["indexed"] or changes["removed"]:
+                self.retriever.vector_store = vector_store
+                self.vector_store = vector_store
+                index_version.set(vector_store.version)
+                index_reloads.labels("swapped").inc()
+                print(f"Swapped in index version {vector_store.version} with {len(vector_store)} chunks")
+            else:
+                index_reloads.labels("unchanged").inc()
+            index_reload_seconds.observe(time.time() - start_time)
+            return changes
+        finally:
+            self._reload_lock.release()
+
+    async def areload(self) -> Optional[Dict[str, int]]:
+        """reload() on its own thread, leaving the retrieval executor to queries."""
+        return await asyncio.to_thread(self.reload)
+
+    @staticmethod
+    def _timed_phase(phase: str, fn):
+        start_time = time.time()
+        result = fn()
+        startup_phase_seconds.labels(phase).set(time.time() - start_time)
+        print(f"Startup phase {phase}: {time.time() - start_time:.2f} seconds")
+        return result
 
-    def format_sources(self, docs):
+    def format_sources(self, metas: List[Optional[ChunkMeta]]):
         sources = []
-        for i, doc in enumerate(docs[:3]): 
-            summary = doc[:150] + "..." if len(doc) > 150 else doc
-            sources.append(f"{i+1}. {summary}")
+        for i, meta in enumerate(metas[:3]):
+            if meta is not None:
+                sources.append(f"{i+1}. {meta.snippet} — *{meta.source}*")
         return sources
 
+    def _collect_links(self, metas: List[Optional[ChunkMeta]]) -> List[str]:
+        # URLs were extracted at index time; just merge them in retrieval order
+        links = dict.fromkeys(url for meta in metas if meta is not None for url in meta.urls)
+        return list(links)[:5]
+
+    def _prepare_context(self, retrieval: Retrieval) -> Tuple[List[str], List[Optional[ChunkMeta]]]:
+        """Pack the retrieved chunks into the prompt token budget."""
+        with span("pack"):
+            docs, indices = self.context_packer.pack(retrieval.docs)
+        return docs, [retrieval.metas[i] for i in indices]
+
+    async def _aretrieve_context(self, input_text: str, on_retrieval: Optional[Callable[[Retrieval], None]]
+                                 ) -> Tuple[Retrieval, List[str], List[Optional[ChunkMeta]], List[str]]:
+        """Retrieval shared by aquery() and astream_query(): the retrieval, packed chunks, their metas and links."""
+        with span("retrieval"):
+            retrieval = await self.batcher.retrieve(input_text, k=DEFAULT_TOP_K)
+        if on_retrieval is not None:
+            on_retrieval(retrieval)
+        # Token counting is CPU work, keep it off the event loop
+        relevant_docs, metas = await asyncio.get_running_loop().run_in_executor(
+            self.executor, self._prepare_context, retrieval
+        )
+        return retrieval, relevant_docs, metas, self._collect_links(metas)
+
+    def _format_response(self, generated_response: str, metas: List[Optional[ChunkMeta]], unique_links: List[str]) -> str:
+        formatted_response = "🤖 **Answer**\n"
+        formatted_response += f"{generated_response}\n\n"
+        return formatted_response + self._format_sources(metas, unique_links)
+
+    def _format_sources(self, metas: List[Optional[ChunkMeta]], unique_links: List[str]) -> str:
+        formatted_response = "📚 **Sources**\n"
+        formatted_response += "\n".join(self.format_sources(metas)) + "\n\n"
+
+        if unique_links:
+            formatted_response += "🔗 **Related Links**\n"
+            for link in unique_links:
+                formatted_response += f"- [{link.split('//')[-1].split('/')[0]}]({link})\n"
+        return formatted_response
+
     def query(self, input_text: str) -> str:
         """Execute the full RAG chain with detailed output formatting"""
         try:
@@ -252,17 +467,10 @@ class RAGAgent:
 
             print("\n1. Retrieving relevant documents...")
             retrieval_start = time.time()
-            relevant_docs = self.retriever.retrieve(input_text, k=DEFAULT_TOP_K)
-
-            all_links = []
-            for doc in relevant_docs:
-                all_links.extend(self.extract_urls(doc))
-            unique_links = list(set(all_links))[:5]  
-
-            # Truncate context if too long
-            total_context = " ".join(relevant_docs)
-            if len(total_context) > self.max_context_length:
-                relevant_docs = relevant_docs[:2]  # Further limit context
+            with span("retrieval"):
+                retrieval = self.retriever.search_many([input_text], k=DEFAULT_TOP_K)[0]
+            relevant_docs, metas = self._prepare_context(retrieval)
+            unique_links = self._collect_links(metas)
 
             print(f"Found {len(relevant_docs)} relevant documents")
             print(f"Retrieved {len(unique_links)} unique links")
@@ -274,23 +482,14 @@ class RAGAgent:
 
             print("\n2. Generating response...")
             generation_start = time.time()
-            generated_response = self.generator.generate(input_text, relevant_docs)
+            generated_response = self.generator.generate(input_text, relevant_docs, retrieval.query_embedding)
             
             if not generated_response:
                 return "🤖 **Answer**\nI apologize, but I couldn't generate a response. Please try again."
             
             print(f"Generation time: {time.time() - generation_start:.2f} seconds")
 
-            formatted_response = "🤖 **Answer**\n"
-            formatted_response += f"{generated_response}\n\n"
-            
-            formatted_response += "📚 **Sources**\n"
-            formatted_response += "\n".join(self.format_sources(relevant_docs)) + "\n\n"
-            
-            if unique_links:
-                formatted_response += "🔗 **Related Links**\n"
-                for link in unique_links:
-                    formatted_response += f"- [{link.split('//')[-1].split('/')[0]}]({link})\n"
+            formatted_response = self._format_response(generated_response, metas, unique_links)
 
             print(f"\nTotal processing time: {time.time() - start_time:.2f} seconds")
             print(f"{'=' * 50}\n")
@@ -298,3 +497,72 @@ class RAGAgent:
         except Exception as e:
             print(f"Error in RAG chain: {str(e)}")
             return "🤖 **Answer**\nAn error occurred while processing your request. Please try again."
+
+    async def aquery(self, input_text: str, on_retrieval: Optional[Callable[[Retrieval], None]] = None) -> str:
+        """
+        Async RAG chain for the Discord event loop.
+
+        Embedding and FAISS search run on the bounded retrieval executor
+        (retrieval is micro-batched across concurrent queries) and the LLM
+        call uses the async client, so up to
+        QUERY_CONCURRENCY queries can be in flight at once. on_retrieval,
+        if given, is called with the retrieved chunks (e.g. to record
+        feedback against them).
+        """
+        async with self.query_semaphore:
+            try:
+                print(f"Processing query (async): '{input_text}'")
+                start_time = time.time()
+
+                retrieval_start = time.time()
+                retrieval, relevant_docs, metas, unique_links = await self._aretrieve_context(input_text, on_retrieval)
+                print(f"Retrieval time: {time.time() - retrieval_start:.2f} seconds")
+
+                if not relevant_docs:
+                    print("No relevant documents found!")
+                    return "🤖 **Answer**\nI'm sorry, I couldn't find relevant information to answer your question."
+
+                generation_start = time.time()
+                generated_response = await self.generator.agenerate(
+                    input_text, relevant_docs, retrieval.query_embedding
+                )
+
+                if not generated_response:
+                    return "🤖 **Answer**\nI apologize, but I couldn't generate a response. Please try again."
+
+                print(f"Generation time: {time.time() - generation_start:.2f} seconds")
+                print(f"Total processing time: {time.time() - start_time:.2f} seconds")
+                return self._format_response(generated_response, metas, unique_links)
+            except Exception as e:
+                print(f"Error in RAG chain: {str(e)}")
+                return "🤖 **Answer**\nAn error occurred while processing your request. Please try again."
+
+    async def astream_query(self, input_text: str,
+                            on_retrieval: Optional[Callable[[Retrieval], None]] = None) -> AsyncIterator[str]:
+        """
+        Streaming variant of aquery().
+
+        Yields the answer header, then answer tokens as the LLM produces
+        them, then the sources section. Concatenating everything gives the
+        same text aquery() would have returned.
+        """
+        async with self.query_semaphore:
+            try:
+                print(f"Processing query (streaming): '{input_text}'")
+                start_time = time.time()
+
+                retrieval, relevant_docs, metas, unique_links = await self._aretrieve_context(input_text, on_retrieval)
+
+                if not relevant_docs:
+                    print("No relevant documents found!")
+                    yield "🤖 **Answer**\nI'm sorry, I couldn't find relevant information to answer your question."
+                    return
+
+                yield "🤖 **Answer**\n"
+                async for token in self.generator.astream(input_text, relevant_docs, retrieval.query_embedding):
+                    yield token
+                yield "\n\n" + self._format_sources(metas, unique_links)
+                print(f"Total processing time: {time.time() - start_time:.2f} seconds")
+            except Exception as e:
+                print(f"Error in RAG chain: {str(e)}")
+                yield "\n\nAn error occurred while processing your request. Please try again."
@@ -0,0 +1,64 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import List, Optional, Set, Tuple
+from ..config.settings import *
+
+
+class QueryBatcher:
+    """
+    Async micro-batcher in front of Retriever.search_many().
+
+    Queries that arrive within max_wait_ms of the first queued one (up to
+    max_batch_size of them) are encoded and searched in a single call on
+    the executor. With max_batch_size=1 every query runs on its own.
+    """
+
+    def __init__(self, retriever, executor: Executor,
+                 max_batch_size: int = RETRIEVAL_MAX_BATCH,
+                 max_wait_ms: float = RETRIEVAL_BATCH_WINDOW_MS):
+        self.retriever = retriever
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[str, int, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The event loop only keeps weak references to tasks; a collected one would strand its waiters
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def retrieve(self, query: str, k: int = 3):
+        """Resolve to the query's Retrieval (embedding, chunk IDs and texts)."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, k, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, int, asyncio.Future]]):
+        loop = asyncio.get_running_loop()
+        queries = [query for query, _, _ in batch]
+        max_k = max(k for _, k, _ in batch)
+        try:
+            results = await loop.run_in_executor(self.executor, self.retriever.search_many, queries, max_k)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, k, future), retrieval in zip(batch, results):
+            if not future.done():
+                future.set_result(retrieval.top(k))
@@ -0,0 +1,197 @@
+import os
+import re
+import sys
+import math
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+import numpy as np
+from ..config.settings import *
+
+
+# Bump when tokenize() changes so saved postings get rebuilt
+TOKENIZER_VERSION = 1
+
+# Words plus compound tokens such as URLs, file names, commands and emails
+_TOKEN = re.compile(r"\w+(?:[-./:@#]+\w+)*")
+_WORD = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; compound tokens also contribute their word parts."""
+    tokens = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        parts = _WORD.findall(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int, rrf_k: int = RRF_K) -> List[int]:
+    """Merge ranked ID lists: each list contributes 1 / (rrf_k + rank) per ID."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, vector_id in enumerate(ranking, start=1):
+            scores[vector_id] = scores.get(vector_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=scores.get, reverse=True)[:k]
+
+
+class BM25Index:
+    """
+    In-memory inverted index over the VectorStore chunks, keyed by vector ID.
+
+    Each term's posting list is a pair of packed arrays (int32 IDs, uint16
+    term frequencies). IDs are handed out in increasing order, so appends
+    keep the lists sorted. Removal filters only the lists of the removed
+    chunks' terms. Scoring is vectorised with numpy over the query terms'
+    posting lists.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.doc_len = array('I')  # Indexed by vector ID
+        self.indexed = array('B')  # 1 where the vector ID is indexed; chunks without terms have doc_len 0
+        self.num_docs = 0
+        self.total_len = 0
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    def add(self, ids: List[int], texts: List[str]):
+        """Index chunks under their vector IDs."""
+        if ids and max(ids) >= len(self.doc_len):
+            self.doc_len.extend([0] * (max(ids) + 1 - len(self.doc_len)))
+            self.indexed.extend([0] * (len(self.doc_len) - len(self.indexed)))
+
+        for vector_id, text in zip(ids, texts):
+            terms = Counter(tokenize(text))
+            length = sum(terms.values())
+            self.doc_len[vector_id] = length
+            self.indexed[vector_id] = 1
+            self.num_docs += 1
+            self.total_len += length
+            for term, tf in terms.items():
+                posting = self.postings.get(term)
+                if posting is None:
+                    posting = self.postings[term] = (array('i'), array('H'))
+                posting[0].append(vector_id)
+                posting[1].append(min(tf, 0xFFFF))
+
+    def remove(self, ids: List[int], texts: List[str]):
+        """Drop chunks; texts must be the ones they were added with."""
+        if not ids:
+            return
+        removed = np.array(ids, dtype=np.int32)
+        for term in {term for text in texts for term in tokenize(text)}:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            term_ids = np.frombuffer(posting[0], dtype=np.int32)
+            keep = ~np.isin(term_ids, removed)
+            if keep.all():
+                continue
+            if not keep.any():
+                del self.postings[term]
+                continue
+            self.postings[term] = (
+                array('i', term_ids[keep].tobytes()),
+                array('H', np.frombuffer(posting[1], dtype=np.uint16)[keep].tobytes())
+            )
+
+        for vector_id in ids:
+            if vector_id < len(self.indexed) and self.indexed[vector_id]:
+                self.total_len -= self.doc_len[vector_id]
+                self.doc_len[vector_id] = 0
+                self.indexed[vector_id] = 0
+                self.num_docs -= 1
+
+    def search(self, query: str, k: int = 3) -> List[int]:
+        """Return the IDs of the k best BM25 matches for query."""
+        if not self.num_docs:
+            return []
+        doc_len = np.frombuffer(self.doc_len, dtype=np.uint32)
+        avg_len = self.total_len / self.num_docs
+
+        ids, scores = [], []
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            term_ids = np.frombuffer(posting[0], dtype=np.int32)
+            tf = np.frombuffer(posting[1], dtype=np.uint16).astype(np.float32)
+            idf = math.log(1 + (self.num_docs - len(term_ids) + 0.5) / (len(term_ids) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * doc_len[term_ids] / avg_len)
+            ids.append(term_ids)
+            scores.append(idf * tf * (self.k1 + 1) / (tf + norm))
+        if not ids:
+            return []
+
+        if len(ids) == 1:
+            unique_ids, totals = ids[0], scores[0]
+        elif sum(map(len, ids)) > len(doc_len) // 8:
+            # Long lists: accumulating into a dense score array beats sorting
+            totals = np.bincount(np.concatenate(ids), weights=np.concatenate(scores), minlength=len(doc_len))
+            unique_ids = np.flatnonzero(totals)
+            totals = totals[unique_ids]
+        else:
+            unique_ids, inverse = np.unique(np.concatenate(ids), return_inverse=True)
+            totals = np.bincount(inverse, weights=np.concatenate(scores))
+        if len(unique_ids) > k:
+            top = np.argpartition(-totals, k)[:k]
+        else:
+            top = np.arange(len(unique_ids))
+        top = top[np.argsort(-totals[top], kind='stable')]
+        return unique_ids[top].tolist()
+
+    def search_many(self, queries: List[str], k: int = 3) -> List[List[int]]:
+        return [self.search(query, k) for query in queries]
+
+    def memory_bytes(self) -> int:
+        """Approximate heap size of the postings, vocabulary and length table."""
+        total = sys.getsizeof(self.postings) + sys.getsizeof(self.doc_len) + sys.getsizeof(self.indexed)
+        for term, (term_ids, tfs) in self.postings.items():
+            total += sys.getsizeof(term) + sys.getsizeof(term_ids) + sys.getsizeof(tfs) + 56  # tuple
+        return total
+
+    def save(self, directory: Path):
+        """Write all posting lists into one flat .npz file."""
+        terms = list(self.postings)
+        lengths = np.fromiter((len(self.postings[term][0]) for term in terms), dtype=np.int64, count=len(terms))
+        tmp_file = Path(directory) / "bm25.npz.tmp"
+        with open(tmp_file, 'wb') as f:
+            np.savez(
+                f,
+                version=np.array([TOKENIZER_VERSION, self.num_docs, self.total_len], dtype=np.int64),
+                terms=np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8),
+                offsets=np.concatenate(([0], np.cumsum(lengths))),
+                ids=np.frombuffer(b"".join(self.postings[term][0].tobytes() for term in terms), dtype=np.int32),
+                tfs=np.frombuffer(b"".join(self.postings[term][1].tobytes() for term in terms), dtype=np.uint16),
+                doc_len=np.frombuffer(self.doc_len, dtype=np.uint32),
+                indexed=np.frombuffer(self.indexed, dtype=np.uint8),
+            )
+        os.replace(tmp_file, Path(directory) / "bm25.npz")
+
+    @classmethod
+    def load(cls, directory: Path) -> "BM25Index":
+        """Load postings written by save(); raises ValueError if they are stale."""
+        with np.load(Path(directory) / "bm25.npz") as data:
+            version, num_docs, total_len = data["version"].tolist()
+            if version != TOKENIZER_VERSION:
+                raise ValueError(f"BM25 tokenizer version {version} != {TOKENIZER_VERSION}")
+            if "indexed" not in data.files:
+                raise ValueError("BM25 index has no indexed-ID table")
+            terms = data["terms"].tobytes().decode("utf-8").split("\n") if data["terms"].size else []
+            offsets, ids, tfs = data["offsets"], data["ids"], data["tfs"]
+            index = cls()
+            for term, start, stop in zip(terms, offsets[:-1].tolist(), offsets[1:].tolist()):
+                index.postings[term] = (array('i', ids[start:stop].tobytes()), array('H', tfs[start:stop].tobytes()))
+            index.doc_len = array('I', data["doc_len"].tobytes())
+            index.indexed = array('B', data["indexed"].tobytes())
+        index.num_docs = num_docs
+        index.total_len = total_len
+        return index
@@ -0,0 +1,52 @@
+from typing import List, Optional, Tuple
+from urlextract import URLExtract
+
+
+SNIPPET_LENGTH = 150
+
+
+class ChunkMeta:
+    """
+    Everything the answer formatting needs about a chunk, computed once
+    at index time so queries never run URL extraction or slice raw text.
+    """
+
+    __slots__ = ("source", "offset", "urls", "snippet")
+
+    def __init__(self, source: str, offset: int, urls: Tuple[str, ...], snippet: str):
+        self.source = source
+        self.offset = offset  # Character offset of the chunk in its source file, -1 if unknown
+        self.urls = urls
+        self.snippet = snippet
+
+    def to_list(self) -> list:
+        return [self.source, self.offset, list(self.urls), self.snippet]
+
+    @classmethod
+    def from_list(cls, data: list) -> "ChunkMeta":
+        source, offset, urls, snippet = data
+        return cls(source, offset, tuple(urls), snippet)
+
+
+class ChunkMetaBuilder:
+    """Builds ChunkMeta records; holds the one URLExtract instance (its TLD list is costly to load)."""
+
+    def __init__(self):
+        self._extractor: Optional[URLExtract] = None
+
+    def urls(self, text: str) -> Tuple[str, ...]:
+        if self._extractor is None:
+            self._extractor = URLExtract()
+        return tuple(dict.fromkeys(self._extractor.find_urls(text)))
+
+    def build(self, source: str, content: str, chunks: List[str], base_offset: int = 0) -> List[ChunkMeta]:
+        """Metadata for chunks split, in order, from content (which starts at base_offset in source)."""
+        metas = []
+        search_from = 0
+        for chunk in chunks:
+            offset = content.find(chunk, search_from)
+            if offset >= 0:
+                search_from = offset + 1
+            snippet = chunk[:SNIPPET_LENGTH] + "..." if len(chunk) > SNIPPET_LENGTH else chunk
+            metas.append(ChunkMeta(source, offset + base_offset if offset >= 0 else -1, self.urls(chunk), snippet))
+        return metas
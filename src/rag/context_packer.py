@@ -0,0 +1,102 @@
+import threading
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+from ..config.settings import *
+
+
+# Shortest shared prefix/suffix treated as splitter overlap rather than coincidence
+MIN_OVERLAP_CHARS = 10
+
+
+@lru_cache(maxsize=None)
+def load_tokenizer(name: str):
+    """Load a Hugging Face tokenizer once per process; None if unavailable."""
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(name, cache_dir=MODEL_CACHE_DIR)
+    except Exception as e:
+        print(f"Could not load tokenizer '{name}', estimating tokens from characters: {e}")
+        return None
+
+
+def _overlap(left: str, right: str, max_chars: int) -> int:
+    """Length of the longest suffix of left that is also a prefix of right."""
+    for n in range(min(len(left), len(right), max_chars), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:n]):
+            return n
+    return 0
+
+
+class ContextPacker:
+    """
+    Fits retrieved chunks into a prompt token budget.
+
+    Chunks are taken in retrieval order (best first). Exact duplicates and
+    chunks contained in one already taken are dropped, and text shared with
+    a neighbouring chunk through the splitter's CHUNK_OVERLAP is trimmed.
+    The first chunk that does not fit is truncated if enough budget is left
+    to be useful (or if nothing has been packed yet); packing stops there.
+    """
+
+    def __init__(self, budget: int = CONTEXT_TOKEN_BUDGET, tokenizer_name: str = CONTEXT_TOKENIZER,
+                 max_overlap: int = CHUNK_OVERLAP * 2, min_tail_tokens: int = 64):
+        self.budget = budget
+        self.tokenizer_name = tokenizer_name
+        self.max_overlap = max_overlap
+        self.min_tail_tokens = min_tail_tokens
+        self._lock = threading.Lock()
+        # Chunks repeat across queries, so their token counts are cached
+        self.count_tokens = lru_cache(maxsize=CONTEXT_TOKEN_CACHE_SIZE)(self._count_tokens)
+
+    @property
+    def tokenizer(self):
+        return load_tokenizer(self.tokenizer_name)
+
+    def _count_tokens(self, text: str) -> int:
+        tokenizer = self.tokenizer
+        if tokenizer is None:
+            return (len(text) + 3) // 4
+        with self._lock:  # Fast tokenizers are not safe to share between threads
+            return len(tokenizer.encode(text, add_special_tokens=False))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text to at most max_tokens tokens."""
+        tokenizer = self.tokenizer
+        if tokenizer is None:
+            return text[:max_tokens * 4]
+        with self._lock:
+            ids = tokenizer.encode(text, add_special_tokens=False)
+            return tokenizer.decode(ids[:max_tokens])
+
+    def _dedupe(self, text: str, kept: List[str]) -> Optional[str]:
+        """Text minus what kept chunks already cover; None if nothing new remains."""
+        for other in kept:
+            if text in other:
+                return None
+            prefix = _overlap(other, text, self.max_overlap)
+            if prefix:
+                text = text[prefix:]
+            suffix = _overlap(text, other, self.max_overlap)
+            if suffix:
+                text = text[:-suffix]
+        return text if text.strip() else None
+
+    def pack(self, docs: Sequence[str]) -> Tuple[List[str], List[int]]:
+        """Return the packed chunk texts and the indices of the docs they came from."""
+        packed, indices = [], []
+        used = 0
+        for i, doc in enumerate(docs):
+            text = self._dedupe(doc, [docs[j] for j in indices])
+            if text is None:
+                continue
+            tokens = self.count_tokens(text)
+            if used + tokens > self.budget:
+                remaining = self.budget - used
+                if remaining >= self.min_tail_tokens or not packed:
+                    packed.append(self.truncate(text, remaining))
+                    indices.append(i)
+                break
+            packed.append(text)
+            indices.append(i)
+            used += tokens
+        return packed, indices
@@ -0,0 +1,40 @@
+import asyncio
+from typing import Dict, Tuple
+from ..config.settings import *
+
+
+class DocsWatcher:
+    """
+    Polls the docs directory and hot-reloads the agent's index when a
+    file is added, removed or modified. Only stat() calls run between
+    reloads; content hashing happens inside the reload itself.
+    """
+
+    def __init__(self, agent, interval: float = DOCS_WATCH_INTERVAL):
+        self.agent = agent
+        self.interval = interval
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for file_path in self.agent.document_loader.discover_files():
+            try:
+                stat = file_path.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[str(file_path)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    async def run(self):
+        last = await asyncio.to_thread(self._snapshot)
+        while True:
+            await asyncio.sleep(self.interval)
+            current = await asyncio.to_thread(self._snapshot)
+            if current == last:
+                continue
+            print("Change detected in docs, reloading index...")
+            try:
+                if await self.agent.areload() is not None:
+                    last = current
+            except Exception as e:
+                print(f"Index reload failed: {e}")
+                last = current  # Don't retry a broken file every tick; the next edit triggers a reload
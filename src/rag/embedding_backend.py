@@ -0,0 +1,179 @@
+"""
+Sentence embedding backends for DocumentLoader.
+
+    torch      SentenceTransformer on PyTorch
+    onnx       ONNX Runtime export of the same model
+    onnx-int8  the ONNX export with dynamically int8-quantized weights
+
+The ONNX backends are exported under MODEL_CACHE_DIR on first use (or ahead
+of time with ``python -m src.rag.embedding_backend onnx-int8``) and checked
+against the PyTorch embeddings once. At query time they only need
+onnxruntime and tokenizers, so neither torch nor sentence-transformers is
+imported.
+"""
+import json
+import argparse
+from pathlib import Path
+from typing import List, Union
+import numpy as np
+from ..config.settings import *
+
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# Sentences the exported model must embed like the PyTorch one
+PARITY_TEXTS = [
+    "How do I submit my weekly project?",
+    "What is the schedule of the AI bootcamp?",
+    "Interns install Python, Git and Docker before the first week.",
+    "Recorded lectures are available on the course playlist: https://youtube.com/playlist?list=example",
+    "Projects are evaluated on correctness, code quality and the final presentation.",
+    "ok",
+]
+
+
+def parity(model, reference, texts: List[str] = PARITY_TEXTS) -> float:
+    """Lowest cosine similarity between the two models' embeddings of texts."""
+    a = model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    b = reference.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    return float(np.min(np.sum(a * b, axis=1)))
+
+
+class OnnxEncoder:
+    """
+    The encode() / get_sentence_embedding_dimension() subset of
+    SentenceTransformer for an exported Transformer + mean Pooling
+    (+ optional Normalize) model, on onnxruntime and tokenizers alone.
+    """
+
+    def __init__(self, model_dir: Path, file_name: str, threads: int = 0):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        modules = [module["type"].rsplit(".", 1)[-1] for module in json.loads((model_dir / "modules.json").read_text())]
+        if modules[:2] != ["Transformer", "Pooling"] or set(modules[2:]) - {"Normalize"}:
+            raise ValueError(f"Unsupported sentence-transformers modules: {modules}")
+        pooling = json.loads((model_dir / "1_Pooling" / "config.json").read_text())
+        if not pooling.get("pooling_mode_mean_tokens"):
+            raise ValueError("Only mean pooling is supported")
+        self.dimension = pooling["word_embedding_dimension"]
+        self.normalize = "Normalize" in modules
+        max_seq_length = json.loads((model_dir / "sentence_bert_config.json").read_text()).get("max_seq_length", 128)
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_seq_length)
+        pad_token = json.loads((model_dir / "tokenizer_config.json").read_text()).get("pad_token") or "[PAD]"
+        if isinstance(pad_token, dict):
+            pad_token = pad_token["content"]
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            str(model_dir / file_name), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, convert_to_numpy: bool = True,
+               show_progress_bar: bool = False, normalize_embeddings: bool = False) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+            attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+            hidden = self.session.run(None, feeds)[0]  # last_hidden_state
+
+            mask = attention_mask[:, :, None].astype(np.float32)
+            embeddings[start:start + len(encodings)] = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+        if self.normalize or normalize_embeddings:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings[0] if single else embeddings
+
+
+def _export_dir() -> Path:
+    return Path(MODEL_CACHE_DIR) / "onnx" / EMBEDDING_MODEL.replace("/", "--")
+
+
+def _torch_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL, cache_folder=MODEL_CACHE_DIR)
+
+
+def export(backend: str) -> str:
+    """
+    Export the embedding model for an ONNX backend (once) and return its
+    file name inside _export_dir().
+
+    Needs sentence-transformers with optimum[onnxruntime]. Raises
+    ValueError if the export's embeddings drift further from the PyTorch
+    ones than EMBEDDING_PARITY_MIN allows.
+    """
+    export_dir = _export_dir()
+    quantize = backend == "onnx-int8"
+    file_name = f"onnx/model_qint8_{EMBEDDING_QUANTIZATION}.onnx" if quantize else "onnx/model.onnx"
+    report_file = export_dir / "parity.json"
+    report = json.loads(report_file.read_text()) if report_file.exists() else {}
+
+    if not (export_dir / file_name).exists() or file_name not in report:
+        from sentence_transformers import SentenceTransformer
+        onnx_kwargs = {"provider": "CPUExecutionProvider"}
+        if not (export_dir / "onnx" / "model.onnx").exists():
+            print(f"Exporting {EMBEDDING_MODEL} to ONNX...")
+            SentenceTransformer(
+                EMBEDDING_MODEL, backend="onnx", cache_folder=MODEL_CACHE_DIR, model_kwargs=onnx_kwargs
+            ).save_pretrained(str(export_dir))
+        if quantize and not (export_dir / file_name).exists():
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+            print(f"Quantizing {EMBEDDING_MODEL} to int8 ({EMBEDDING_QUANTIZATION})...")
+            model = SentenceTransformer(
+                str(export_dir), backend="onnx", model_kwargs={"file_name": "onnx/model.onnx", **onnx_kwargs}
+            )
+            export_dynamic_quantized_onnx_model(model, EMBEDDING_QUANTIZATION, str(export_dir))
+        report[file_name] = parity(OnnxEncoder(export_dir, file_name), _torch_model())
+        report_file.write_text(json.dumps(report, indent=2))
+        print(f"{file_name}: minimum cosine similarity to torch embeddings {report[file_name]:.4f}")
+
+    if report[file_name] < EMBEDDING_PARITY_MIN:
+        raise ValueError(f"{file_name} parity {report[file_name]:.4f} < {EMBEDDING_PARITY_MIN}")
+    return file_name
+
+
+def load_embedding_model(backend: str = EMBEDDING_BACKEND, threads: int = EMBEDDING_THREADS):
+    """
+    Load the sentence embedding model on the given backend; threads caps
+    the runtime's intra-op threads (0 = library default). ONNX backends
+    fall back to torch when their packages are missing or the export
+    fails its parity check.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {BACKENDS}")
+
+    if backend != "torch":
+        try:
+            return OnnxEncoder(_export_dir(), export(backend), threads)
+        except Exception as e:
+            print(f"Could not load {backend} embedding backend, using torch: {e}")
+
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    return _torch_model()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the embedding model for an ONNX backend ahead of time.")
+    parser.add_argument("backend", choices=BACKENDS[1:])
+    export(parser.parse_args().backend)
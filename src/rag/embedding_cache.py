@@ -0,0 +1,235 @@
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache backed by memory-mapped arrays.
+
+    Entries are keyed by a 64-bit hash of (model name, chunk text). Vectors
+    live in one contiguous float32/float16 file that is only ever appended
+    to; a sorted key array plus a parallel slot array map keys to rows, so
+    opening the cache is a couple of mmaps instead of an unpickle.
+
+    New entries are buffered in memory until flush(). A flush writes fresh
+    key/slot/access files and then atomically replaces meta.json, which
+    names the files belonging to the current generation, so a crash never
+    leaves a half-written cache behind. When the cache grows past
+    max_entries the least recently used rows are evicted and the vector
+    file is compacted.
+    """
+
+    def __init__(self, cache_dir: Path, model_name: str, dimension: int,
+                 dtype: str = "float32", max_entries: int = 1_000_000):
+        self.cache_dir = Path(cache_dir)
+        self.model_name = model_name
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._pending: Dict[int, np.ndarray] = {}
+        self._pending_access: Dict[int, int] = {}
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._open()
+
+    def _key(self, text: str) -> int:
+        digest = hashlib.blake2b(f"{self.model_name}\0{text}".encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    def _open(self):
+        """Map the files named by meta.json, or start empty (removing a cache built for another model)."""
+        self._meta = {"seq": 0, "vectors": None, "rows": 0, "clock": 0}
+        try:
+            with open(self.cache_dir / "meta.json", 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if (meta["model"], meta["dimension"], meta["dtype"]) == (self.model_name, self.dimension, self.dtype.name):
+                self._meta = meta
+            else:
+                print(f"Embedding cache holds {meta['model']} {meta['dimension']}-d {meta['dtype']} vectors, "
+                      f"starting over")
+                self._remove_all()
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, KeyError):
+            self._remove_all()
+
+        seq = self._meta["seq"]
+        if self._meta["vectors"] is None:
+            self._keys = np.empty(0, dtype=np.uint64)
+            self._slots = np.empty(0, dtype=np.int64)
+            self._access = np.empty(0, dtype=np.int64)
+            self._vectors = np.empty((0, self.dimension), dtype=self.dtype)
+            self._clock = 0
+            return
+
+        self._keys = np.load(self.cache_dir / f"keys-{seq}.npy", mmap_mode='r')
+        self._slots = np.load(self.cache_dir / f"slots-{seq}.npy", mmap_mode='r')
+        # Copy-on-write: recency updates stay in memory until the next flush
+        self._access = np.load(self.cache_dir / f"access-{seq}.npy", mmap_mode='c')
+        self._clock = self._meta["clock"]
+
+        vectors_file = self.cache_dir / self._meta["vectors"]
+        rows = self._meta["rows"]
+        row_bytes = self.dimension * self.dtype.itemsize
+        # Drop rows appended by a flush that never committed its meta.json
+        if vectors_file.stat().st_size > rows * row_bytes:
+            os.truncate(vectors_file, rows * row_bytes)
+        if rows:
+            self._vectors = np.memmap(vectors_file, dtype=self.dtype, mode='r', shape=(rows, self.dimension))
+        else:
+            self._vectors = np.empty((0, self.dimension), dtype=self.dtype)
+
+    def __len__(self) -> int:
+        return len(self._keys) + len(self._pending)
+
+    def __contains__(self, text: str) -> bool:
+        return self.get(text) is not None
+
+    def _find(self, keys: np.ndarray) -> np.ndarray:
+        """Positions of keys in the sorted key array, -1 where absent."""
+        if not len(self._keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        positions = np.searchsorted(self._keys, keys)
+        positions = np.minimum(positions, len(self._keys) - 1)
+        found = self._keys[positions] == keys
+        return np.where(found, positions, -1)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        vectors, missing = self.get_many([text])
+        return None if missing else vectors[0]
+
+    def get_many(self, texts: List[str]) -> Tuple[np.ndarray, List[int]]:
+        """
+        Look up texts in bulk.
+
+        Returns a float32 (len(texts), dimension) array and the indices of
+        texts that were not cached; their rows are left as zeros.
+        """
+        result = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        keys = np.fromiter((self._key(t) for t in texts), dtype=np.uint64, count=len(texts))
+        missing = []
+        with self._lock:
+            self._clock += 1
+            positions = self._find(keys)
+            for i, (key, position) in enumerate(zip(keys.tolist(), positions.tolist())):
+                if position >= 0:
+                    result[i] = self._vectors[self._slots[position]]
+                    self._access[position] = self._clock
+                elif key in self._pending:
+                    result[i] = self._pending[key]
+                    self._pending_access[key] = self._clock
+                else:
+                    missing.append(i)
+        return result, missing
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        """Buffer new embeddings; they are written on the next flush()."""
+        vectors = np.asarray(vectors, dtype=self.dtype).reshape(len(texts), self.dimension)
+        with self._lock:
+            self._clock += 1
+            for text, vector in zip(texts, vectors):
+                key = self._key(text)
+                if self._find(np.array([key], dtype=np.uint64))[0] >= 0:
+                    continue
+                self._pending[key] = vector
+                self._pending_access[key] = self._clock
+
+    def flush(self):
+        """Append buffered vectors and atomically commit a new generation."""
+        with self._lock:
+            if not self._pending and self._clock == self._meta["clock"]:
+                return
+
+            seq = self._meta["seq"] + 1
+            rows = len(self._vectors)
+            vectors_name = self._meta["vectors"] or f"vectors-{seq}.bin"
+
+            new_keys = np.fromiter(self._pending.keys(), dtype=np.uint64, count=len(self._pending))
+            new_access = np.array([self._pending_access[k] for k in new_keys.tolist()], dtype=np.int64)
+            new_slots = np.arange(rows, rows + len(new_keys), dtype=np.int64)
+
+            keys = np.concatenate([self._keys, new_keys])
+            slots = np.concatenate([self._slots, new_slots])
+            access = np.concatenate([self._access, new_access])
+
+            if len(keys) > self.max_entries:
+                # Evict the least recently used entries and compact the vectors
+                keep = np.sort(np.argpartition(-access, self.max_entries - 1)[:self.max_entries])
+                old_vectors = self._vectors
+                pending_vectors = np.stack(list(self._pending.values())) if self._pending else None
+                vectors_name = f"vectors-{seq}.bin"
+                kept_slots = slots[keep]
+                with open(self.cache_dir / vectors_name, 'wb') as f:
+                    for start in range(0, len(kept_slots), 65536):
+                        block = kept_slots[start:start + 65536]
+                        from_disk = block < rows
+                        out = np.empty((len(block), self.dimension), dtype=self.dtype)
+                        out[from_disk] = old_vectors[block[from_disk]]
+                        if pending_vectors is not None:
+                            out[~from_disk] = pending_vectors[block[~from_disk] - rows]
+                        f.write(out.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                keys, access = keys[keep], access[keep]
+                slots = np.arange(len(keep), dtype=np.int64)
+                rows = len(keep)
+            else:
+                # A fresh cache must not append to a stale file from another model
+                mode = 'ab' if self._meta["vectors"] else 'wb'
+                with open(self.cache_dir / vectors_name, mode) as f:
+                    for vector in self._pending.values():
+                        f.write(vector.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                rows += len(new_keys)
+
+            order = np.argsort(keys, kind='stable')
+            np.save(self.cache_dir / f"keys-{seq}.npy", keys[order])
+            np.save(self.cache_dir / f"slots-{seq}.npy", slots[order])
+            np.save(self.cache_dir / f"access-{seq}.npy", access[order])
+
+            old_meta = self._meta
+            meta = {
+                "model": self.model_name,
+                "dimension": self.dimension,
+                "dtype": self.dtype.name,
+                "seq": seq,
+                "vectors": vectors_name,
+                "rows": rows,
+                "clock": self._clock,
+            }
+            tmp_meta = self.cache_dir / "meta.json.tmp"
+            with open(tmp_meta, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(tmp_meta, self.cache_dir / "meta.json")
+
+            self._pending.clear()
+            self._pending_access.clear()
+            self._remove_generation(old_meta, keep_vectors=vectors_name)
+            self._open()
+
+    def _remove_all(self):
+        """Delete every generation's files, so a new cache neither reuses nor leaks them."""
+        for pattern in ("keys-*.npy", "slots-*.npy", "access-*.npy", "vectors-*.bin", "meta.json"):
+            for path in self.cache_dir.glob(pattern):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _remove_generation(self, meta: Dict, keep_vectors: str):
+        if meta["vectors"] is None:
+            return
+        names = [f"{kind}-{meta['seq']}.npy" for kind in ("keys", "slots", "access")]
+        if meta["vectors"] != keep_vectors:
+            names.append(meta["vectors"])
+        for name in names:
+            try:
+                os.remove(self.cache_dir / name)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,95 @@
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional
+from ..config.settings import *
+
+
+class FeedbackStore:
+    """
+    Answers the bot sent and the 👍/👎 votes they received, in SQLite.
+
+    Each answer is stored under the ID of the Discord message carrying the
+    vote reactions, together with the query, the retrieved chunk IDs,
+    their source files and the index version the IDs belong to (vector IDs
+    are only stable within one index build), so a vote can be traced back
+    to the chunks behind the answer. Each user has one vote per answer;
+    voting again replaces it.
+
+    The methods block on SQLite; the bot calls them through
+    asyncio.to_thread.
+    """
+
+    def __init__(self, path: Path = FEEDBACK_DB_PATH, max_answers: int = FEEDBACK_MAX_ANSWERS):
+        self.path = Path(path)
+        self.max_answers = max_answers
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS answers (
+                    message_id INTEGER PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    chunk_ids TEXT NOT NULL,
+                    sources TEXT NOT NULL,
+                    index_version INTEGER,
+                    user_id INTEGER,
+                    guild_id INTEGER,
+                    created REAL NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS votes (
+                    message_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    vote INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    PRIMARY KEY (message_id, user_id)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS answers_created ON answers (created)")
+        # Kept up to date by record_answer() so inserts need no COUNT(*)
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+
+    def record_answer(self, message_id: int, query: str, chunk_ids: List[int], sources: List[str],
+                      index_version: Optional[int], user_id: Optional[int], guild_id: Optional[int]):
+        with self._lock, self._conn:
+            exists = self._conn.execute("SELECT 1 FROM answers WHERE message_id = ?", (message_id,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers "
+                "(message_id, query, chunk_ids, sources, index_version, user_id, guild_id, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (message_id, query, json.dumps(chunk_ids), json.dumps(sources), index_version,
+                 user_id, guild_id, time.time())
+            )
+            if exists is None:
+                self._count += 1
+            if self._count > self.max_answers:
+                # Oldest answers go first, along with their votes
+                oldest = "SELECT message_id FROM answers ORDER BY created LIMIT ?"
+                excess = (self._count - self.max_answers,)
+                self._conn.execute(f"DELETE FROM votes WHERE message_id IN ({oldest})", excess)
+                evicted = self._conn.execute(f"DELETE FROM answers WHERE message_id IN ({oldest})", excess)
+                self._count -= evicted.rowcount
+
+    def record_vote(self, message_id: int, user_id: int, vote: int) -> bool:
+        """Store a +1/-1 vote on an answer; False if the message is not a recorded answer."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR REPLACE INTO votes (message_id, user_id, vote, created) "
+                "SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM answers WHERE message_id = ?)",
+                (message_id, user_id, vote, time.time(), message_id)
+            )
+            return cursor.rowcount > 0
+
+    def remove_vote(self, message_id: int, user_id: int, vote: int):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM votes WHERE message_id = ? AND user_id = ? AND vote = ?",
+                (message_id, user_id, vote)
+            )
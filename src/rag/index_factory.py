@@ -0,0 +1,93 @@
+from typing import Optional
+import faiss
+from ..config.settings import *
+
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# FAISS wants roughly this many training points per IVF centroid
+MIN_POINTS_PER_CENTROID = 39
+
+
+def resolve_index_type(index_type: str, corpus_size: int) -> str:
+    """Turn INDEX_TYPE (possibly "auto") into a concrete type for corpus_size vectors."""
+    if index_type == "auto":
+        if corpus_size <= INDEX_AUTO_FLAT_MAX:
+            index_type = "flat"
+        elif corpus_size <= INDEX_AUTO_HNSW_MAX:
+            index_type = "hnsw"
+        else:
+            index_type = "ivf_pq"
+
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}', expected 'auto' or one of {INDEX_TYPES}")
+
+    # Too few vectors to train the quantizers: fall back to something that works
+    if index_type == "ivf_pq" and corpus_size < (1 << PQ_NBITS) * MIN_POINTS_PER_CENTROID:
+        index_type = "ivf_flat"
+    if index_type == "ivf_flat" and corpus_size < MIN_POINTS_PER_CENTROID:
+        index_type = "flat"
+    return index_type
+
+
+def ivf_nlist(corpus_size: int) -> int:
+    nlist = IVF_NLIST or int(4 * corpus_size ** 0.5)
+    return max(1, min(nlist, corpus_size // MIN_POINTS_PER_CENTROID))
+
+
+def build_index(index_type: str, dimension: int, corpus_size: int) -> faiss.Index:
+    """
+    Create an empty index of the given concrete type.
+
+    IVF indexes store vector IDs in their inverted lists and take them
+    as they are. The other types are wrapped in an IndexIDMap2 so vectors
+    keep stable IDs. An IVF index must not be wrapped: IndexIDMap2
+    compacts its ID map on removal while the inverted lists keep their
+    old positions, so every label after a removal would be wrong. IVF
+    types must be trained before the first add.
+    """
+    if index_type == "flat":
+        base = faiss.IndexFlatL2(dimension)
+    elif index_type == "ivf_flat":
+        base = faiss.IndexIVFFlat(faiss.IndexFlatL2(dimension), dimension, ivf_nlist(corpus_size))
+        base.nprobe = IVF_NPROBE
+        return base
+    elif index_type == "ivf_pq":
+        base = faiss.IndexIVFPQ(faiss.IndexFlatL2(dimension), dimension, ivf_nlist(corpus_size), PQ_M, PQ_NBITS)
+        base.nprobe = IVF_NPROBE
+        return base
+    elif index_type == "hnsw":
+        base = faiss.IndexHNSWFlat(dimension, HNSW_M)
+        base.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        base.hnsw.efSearch = HNSW_EF_SEARCH
+    else:
+        raise ValueError(f"Unknown index type '{index_type}'")
+    return faiss.IndexIDMap2(base)
+
+
+def supports_removal(index_type: str) -> bool:
+    """HNSW graphs cannot drop vectors; such indexes are rebuilt instead."""
+    return index_type != "hnsw"
+
+
+def mmap_flags(index_type: str) -> int:
+    """
+    faiss.read_index flags that map an index read-only instead of reading it.
+
+    IVF indexes map their inverted lists with IO_FLAG_MMAP alone and refuse
+    IO_FLAG_MMAP_IFC; the other types only map their codes with it.
+    """
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    if index_type not in ("ivf_flat", "ivf_pq"):
+        flags |= getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+    return flags
+
+
+def search_parameters(index_type: str, nprobe: Optional[int] = None,
+                      ef_search: Optional[int] = None) -> Optional[faiss.SearchParameters]:
+    """Per-call search tunables; thread safe, unlike setting them on the index."""
+    if index_type in ("ivf_flat", "ivf_pq") and nprobe:
+        return faiss.SearchParametersIVF(nprobe=nprobe)
+    if index_type == "hnsw" and ef_search:
+        return faiss.SearchParametersHNSW(efSearch=ef_search)
+    return None
@@ -0,0 +1,200 @@
+import os
+import json
+import hashlib
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from ..config.settings import *
+from .vector_store import VectorStore
+from .index_factory import resolve_index_type
+from . import ingest
+from ..utils.metrics import ingest_indexed_chunks
+
+
+MANIFEST_VERSION = 3
+
+
+def file_sha256(file_path: Path) -> str:
+    """Hash a file's contents in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IndexStore:
+    """
+    On-disk FAISS index plus a manifest of per-file content hashes.
+
+    sync() loads the saved index and only re-chunks and re-embeds files
+    that were added or changed since it was written; vectors belonging
+    to changed or deleted files are removed by ID. New chunks are
+    streamed from the ingestion pipeline and embedded and added a batch
+    at a time.
+
+    Every sync() loads its own copy from disk and returns a new
+    VectorStore, so a store that is already serving queries is never
+    modified.
+    """
+
+    def __init__(self, index_dir: Path = INDEX_DIR):
+        self.index_dir = Path(index_dir)
+        self.manifest_file = self.index_dir / "manifest.json"
+        self.last_changes: Dict[str, int] = {}  # Files indexed/removed by the last sync()
+
+    def _settings_fingerprint(self) -> Dict:
+        # Any change here invalidates every stored vector
+        return {
+            "version": MANIFEST_VERSION,
+            "embedding_model": EMBEDDING_MODEL,
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP,
+            "index_type": INDEX_TYPE,
+            "index_params": [IVF_NLIST, PQ_M, PQ_NBITS, HNSW_M, HNSW_EF_CONSTRUCTION],
+        }
+
+    def _load(self) -> Optional[tuple]:
+        """Return (vector_store, manifest files) or None if no usable index exists."""
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if manifest.get("settings") != self._settings_fingerprint():
+            print("Index settings changed, rebuilding from scratch")
+            return None
+
+        try:
+            vector_store = VectorStore.load(self.index_dir)
+        except Exception as e:
+            print(f"Could not load saved index: {e}")
+            return None
+
+        # Guard against a crash between writing the index and the manifest
+        manifest_ids = {i for entry in manifest["files"].values() for i in entry["ids"]}
+        if len(vector_store) != len(manifest_ids) or manifest_ids != set(vector_store.texts):
+            print("Saved index does not match manifest, rebuilding from scratch")
+            return None
+
+        return vector_store, manifest["files"]
+
+    def save(self, vector_store: VectorStore, files: Dict[str, Dict]):
+        """Persist the index first and the manifest last, atomically."""
+        vector_store.save(self.index_dir)
+        tmp_manifest = self.manifest_file.with_suffix(".json.tmp")
+        with open(tmp_manifest, 'w', encoding='utf-8') as f:
+            json.dump({"settings": self._settings_fingerprint(), "files": files}, f, indent=2)
+        os.replace(tmp_manifest, self.manifest_file)
+
+    def _ingest(self, document_loader, vector_store: VectorStore, sources: List[Tuple[str, Path]], files: Dict[str, Dict]):
+        """Chunk, embed and add sources one batch at a time, recording each file's vector IDs."""
+        start_time = time.time()
+        held: List[Tuple[list, np.ndarray]] = []  # Batches waiting until there is enough data to train IVF
+        held_count = 0
+        unflushed = 0
+        indexed = 0
+
+        def add(items, embeddings):
+            nonlocal indexed
+            ids = vector_store.add_embeddings(
+                [chunk for _, chunk, _ in items], embeddings, [meta for _, _, meta in items]
+            )
+            for (name, _, _), vector_id in zip(items, ids):
+                files[name]["ids"].append(vector_id)
+            indexed += len(ids)
+            ingest_indexed_chunks.inc(len(ids))
+            elapsed = time.time() - start_time
+            ingest.logger.info("indexed batch", extra={
+                'chunks': indexed, 'batch': len(ids), 'chunks_per_s': round(indexed / max(elapsed, 1e-9), 1)
+            })
+
+        for batch in ingest.iter_batches(sources):
+            embeddings = document_loader.embed_chunks([chunk for _, chunk, _ in batch], flush=False)
+            unflushed += len(batch)
+            if unflushed >= INGEST_CACHE_FLUSH_CHUNKS:
+                document_loader.embedding_cache.flush()
+                unflushed = 0
+
+            if vector_store.index.is_trained:
+                add(batch, embeddings)
+                continue
+            held.append((batch, embeddings))
+            held_count += len(batch)
+            if held_count >= INGEST_TRAIN_SAMPLE:
+                add([item for items, _ in held for item in items], np.concatenate([e for _, e in held]))
+                held, held_count = [], 0
+
+        if held:
+            add([item for items, _ in held for item in items], np.concatenate([e for _, e in held]))
+        document_loader.embedding_cache.flush()
+        ingest.logger.info("ingestion finished", extra={
+            'files': len(sources), 'chunks': indexed, 'latency_ms': round((time.time() - start_time) * 1000, 1)
+        })
+
+    def sync(self, document_loader) -> VectorStore:
+        """Bring the saved index up to date with document_loader.docs_dir."""
+        start_time = time.time()
+        loaded = self._load()
+        if loaded is None:
+            vector_store, files = None, {}
+        else:
+            vector_store, files = loaded
+            print(f"Loaded saved {vector_store.index_type} index with {len(vector_store)} chunks from {len(files)} files")
+
+        docs_path = Path(document_loader.docs_dir)
+        current = {
+            file_path.relative_to(docs_path).as_posix(): file_path
+            for file_path in document_loader.discover_files()
+        }
+        hashes = {name: file_sha256(file_path) for name, file_path in current.items()}
+
+        removed = [name for name in files if name not in current]
+        changed = [name for name in current if name in files and files[name]["sha256"] != hashes[name]]
+        added = [name for name in current if name not in files]
+
+        to_index = changed + added
+        stale_ids = [i for name in removed + changed for i in files[name]["ids"]]
+        if vector_store is not None:
+            corpus_size = len(vector_store) - len(stale_ids) + ingest.estimate_chunks(current[name] for name in to_index)
+            if stale_ids and not vector_store.supports_removal:
+                print(f"{vector_store.index_type} index cannot remove vectors, rebuilding")
+                vector_store = None
+            elif resolve_index_type(INDEX_TYPE, corpus_size) != vector_store.index_type:
+                print(f"Corpus size {corpus_size} calls for a different index type, rebuilding")
+                vector_store = None
+
+        if vector_store is None:
+            # Full build: every current file is (re)indexed, cached embeddings make this cheap
+            to_index = list(current)
+            files = {}
+            corpus_size = ingest.estimate_chunks(current.values())
+            index_type = resolve_index_type(INDEX_TYPE, corpus_size)
+            print(f"Building {index_type} index for about {corpus_size} chunks")
+            vector_store = VectorStore(
+                document_loader.embedding_model.get_sentence_embedding_dimension(),
+                index_type=index_type,
+                corpus_size=corpus_size
+            )
+        else:
+            for name in removed:
+                print(f"Removing deleted file from index: {name}")
+                del files[name]
+            vector_store.remove_ids(stale_ids)
+
+        for name in to_index:
+            files[name] = {"sha256": hashes[name], "ids": []}
+        if to_index:
+            self._ingest(document_loader, vector_store, [(name, current[name]) for name in to_index], files)
+
+        self.last_changes = {"indexed": len(to_index), "removed": len(removed)}
+        if to_index or removed or loaded is None:
+            self.save(vector_store, files)
+            print(f"Index saved: {len(to_index)} files indexed, {len(removed)} removed")
+        else:
+            print("Index is up to date")
+
+        print(f"Index sync took {time.time() - start_time:.2f} seconds")
+        return vector_store
@@ -0,0 +1,183 @@
+import time
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+from ..config.settings import *
+from ..utils.logger import setup_logger
+from ..utils.metrics import ingest_files, ingest_chunks, ingest_bytes
+from .chunk_meta import ChunkMeta, ChunkMetaBuilder
+
+logger = setup_logger('ingest')
+
+TEXT_EXTENSIONS = (".txt", ".md", ".markdown", ".rst")
+HTML_EXTENSIONS = (".html", ".htm")
+SUPPORTED_EXTENSIONS = TEXT_EXTENSIONS + HTML_EXTENSIONS
+
+# (source name, character offset of the block in the source, block text)
+Block = Tuple[str, int, str]
+
+
+def discover_files(docs_dir) -> List[Path]:
+    """All supported documents under docs_dir, recursively, in a stable order."""
+    return sorted(
+        path for path in Path(docs_dir).rglob("*")
+        if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS
+    )
+
+
+class _HTMLText(HTMLParser):
+    SKIP = {"script", "style", "head", "noscript"}
+    BLOCK = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article", "pre"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip += 1
+        elif tag in self.BLOCK:
+            self.parts.append("\n\n")
+        if tag == "a" and not self._skip:
+            # Keep link targets so they end up in the chunk's URL list
+            href = dict(attrs).get("href")
+            if href and href.startswith(("http://", "https://")):
+                self.parts.append(f" {href} ")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def _cut(text: str, final: bool) -> int:
+    """Where to end a block: the last paragraph (or line) break, else everything."""
+    if final:
+        return len(text)
+    for separator in ("\n\n", "\n", " "):
+        cut = text.rfind(separator)
+        if cut > 0:
+            return cut + len(separator)
+    return len(text)
+
+
+def iter_blocks(file_path: Path, source: str, block_chars: int = INGEST_BLOCK_CHARS) -> Iterator[Block]:
+    """Yield a document as blocks of about block_chars characters."""
+    if file_path.suffix.lower() in HTML_EXTENSIONS:
+        parser = _HTMLText()
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+            for data in iter(lambda: f.read(block_chars), ''):
+                parser.feed(data)
+        parser.close()
+        text = "".join(parser.parts)
+        offset = 0
+        while offset < len(text):
+            window = text[offset:offset + block_chars]
+            cut = _cut(window, final=offset + block_chars >= len(text))
+            yield source, offset, window[:cut]
+            offset += cut
+        return
+
+    offset = 0
+    pending = ""
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        while True:
+            data = f.read(block_chars)
+            pending += data
+            if not pending:
+                return
+            cut = _cut(pending, final=not data)
+            yield source, offset, pending[:cut]
+            offset += cut
+            pending = pending[cut:]
+
+
+# Per-process splitter and URL extractor, created on first use in each worker
+_splitter = None
+_meta_builder: Optional[ChunkMetaBuilder] = None
+
+
+def split_block(block: Block) -> Tuple[List[str], List[ChunkMeta]]:
+    """Chunk one block and build its ChunkMeta records; runs in pool workers."""
+    global _splitter, _meta_builder
+    if _splitter is None:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        _splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        _meta_builder = ChunkMetaBuilder()
+    source, offset, text = block
+    chunks = _splitter.split_text(text)
+    return chunks, _meta_builder.build(source, text, chunks, base_offset=offset)
+
+
+def estimate_chunks(file_paths: Iterable[Path]) -> int:
+    """Rough chunk count from file sizes, for choosing an index type before chunking."""
+    total = sum(path.stat().st_size for path in file_paths)
+    return -(-total // max(1, CHUNK_SIZE - CHUNK_OVERLAP))
+
+
+def iter_chunks(files: List[Tuple[str, Path]], workers: int = INGEST_WORKERS) -> Iterator[Tuple[str, str, ChunkMeta]]:
+    """
+    Yield (source, chunk, meta) for every chunk of files, in file order.
+
+    Files are read in blocks cut at paragraph boundaries, never whole, and
+    chunks are handed out as they are produced. Small inputs are split
+    in-process; past INGEST_PARALLEL_MIN_BYTES the blocks go to a process
+    pool with at most 2 * workers blocks in flight.
+    """
+    blocks = (block for source, path in files for block in iter_blocks(path, source))
+    total_bytes = sum(path.stat().st_size for _, path in files)
+    start_time = time.time()
+    chunk_count = 0
+    done_files = set()
+
+    def emit(source: str, chunks: List[str], metas: List[ChunkMeta]):
+        nonlocal chunk_count
+        if source not in done_files:
+            done_files.add(source)
+            ingest_files.inc()
+        ingest_chunks.inc(len(chunks))
+        ingest_bytes.inc(sum(map(len, chunks)))
+        chunk_count += len(chunks)
+        return ((source, chunk, meta) for chunk, meta in zip(chunks, metas))
+
+    if workers <= 1 or total_bytes < INGEST_PARALLEL_MIN_BYTES:
+        for block in blocks:
+            yield from emit(block[0], *split_block(block))
+    else:
+        # spawn, not fork: the parent may hold torch and event loop threads
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            in_flight: Deque = deque()
+            for block in blocks:
+                in_flight.append((block[0], pool.submit(split_block, block)))
+                if len(in_flight) >= 2 * workers:
+                    source, future = in_flight.popleft()
+                    yield from emit(source, *future.result())
+            while in_flight:
+                source, future = in_flight.popleft()
+                yield from emit(source, *future.result())
+
+    logger.info("chunking finished", extra={
+        'files': len(files), 'chunks': chunk_count, 'bytes': total_bytes,
+        'latency_ms': round((time.time() - start_time) * 1000, 1)
+    })
+
+
+def iter_batches(files: List[Tuple[str, Path]], batch_size: int = INGEST_BATCH_SIZE,
+                 workers: int = INGEST_WORKERS) -> Iterator[List[Tuple[str, str, ChunkMeta]]]:
+    """iter_chunks() grouped into lists of at most batch_size chunks."""
+    batch = []
+    for item in iter_chunks(files, workers):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
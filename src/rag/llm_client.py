@@ -0,0 +1,330 @@
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, List, Optional
+import httpx
+import openai
+from openai import OpenAI, AsyncOpenAI
+from ..config.settings import *
+from ..utils.metrics import (
+    llm_retries, llm_requests, llm_request_seconds, llm_hedges, llm_fallbacks, llm_circuit_open
+)
+
+
+class EmptyResponse(Exception):
+    """The model answered without any content."""
+
+
+class LLMUnavailable(Exception):
+    """Every model failed or is skipped by its circuit breaker."""
+
+
+def backoff_delay(attempt: int, base: float = RETRY_DELAY, cap: float = RETRY_MAX_DELAY) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether the same model may succeed on retry: timeouts, connection errors, 408/409/429, 5xx, empty answers."""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, EmptyResponse)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After failure_threshold failures in a row allow() refuses requests for
+    reset_timeout seconds, then lets a single trial request through. The
+    trial's success closes the circuit again, its failure reopens it.
+    """
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, reset_timeout: float = LLM_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+    def release(self):
+        """Forget a request that was cancelled before it could succeed or fail."""
+        with self._lock:
+            self._trial = False
+
+
+class LatencyTracker:
+    """Latencies of a model's recent successful requests."""
+
+    def __init__(self, window: int = LLM_LATENCY_WINDOW, min_samples: int = LLM_HEDGE_MIN_SAMPLES):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The q-quantile of the window, or None until min_samples have been seen."""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+UsageCallback = Optional[Callable[[object], None]]
+
+
+class LLMClient:
+    """
+    Chat completions with timeouts, retries, hedging and model fallback.
+
+    Each model in `models` is tried in order: up to max_attempts times
+    while its errors are retryable (with full-jitter backoff between
+    attempts), then the next model takes over. Models whose circuit
+    breaker is open are skipped. Both OpenAI clients share one pooled
+    httpx client each and never retry on their own.
+
+    With hedging on, acomplete() sends a duplicate request once the first
+    has been running longer than the model's recent LLM_HEDGE_QUANTILE
+    latency and returns whichever answer arrives first. astream() is never
+    hedged.
+    """
+
+    def __init__(self, models: Optional[List[str]] = None, base_url: str = OPENROUTER_BASE_URL,
+                 api_key: Optional[str] = OPENROUTER_API_KEY, max_attempts: int = MAX_RETRIES,
+                 retry_delay: float = RETRY_DELAY, hedge: bool = LLM_HEDGE,
+                 hedge_min_delay: float = LLM_HEDGE_MIN_DELAY):
+        self.models = models or [LLM_MODEL] + [model for model in LLM_FALLBACK_MODELS if model != LLM_MODEL]
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+
+        timeout = httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+        limits = httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+        self.client = OpenAI(
+            base_url=base_url, api_key=api_key, timeout=timeout, max_retries=0,
+            http_client=httpx.Client(timeout=timeout, limits=limits)
+        )
+        self.async_client = AsyncOpenAI(
+            base_url=base_url, api_key=api_key, timeout=timeout, max_retries=0,
+            http_client=httpx.AsyncClient(timeout=timeout, limits=limits)
+        )
+
+        self.breakers: Dict[str, CircuitBreaker] = {model: CircuitBreaker() for model in self.models}
+        self.latencies: Dict[str, LatencyTracker] = {model: LatencyTracker() for model in self.models}
+
+    def _record_success(self, model: str, seconds: float):
+        self.breakers[model].record_success()
+        self.latencies[model].observe(seconds)
+        llm_requests.labels(model, "success").inc()
+        llm_request_seconds.labels(model).observe(seconds)
+        llm_circuit_open.labels(model).set(0)
+        if model != self.models[0]:
+            llm_fallbacks.labels(model).inc()
+
+    def _record_failure(self, model: str, error: Exception):
+        breaker = self.breakers[model]
+        breaker.record_failure()
+        if isinstance(error, openai.APITimeoutError):
+            result = "timeout"
+        elif isinstance(error, EmptyResponse):
+            result = "empty"
+        else:
+            result = "error"
+        llm_requests.labels(model, result).inc()
+        llm_circuit_open.labels(model).set(1 if breaker.opened_at is not None else 0)
+
+    def _should_retry(self, model: str, attempt: int, error: Exception) -> bool:
+        """Log a failed attempt; True to retry the same model, False to move on to the next."""
+        print(f"LLM {model} attempt {attempt + 1}/{self.max_attempts} failed: {error}")
+        if attempt + 1 < self.max_attempts and is_retryable(error):
+            llm_retries.inc()
+            return True
+        return False
+
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        if not self.hedge:
+            return None
+        quantile = self.latencies[model].quantile(LLM_HEDGE_QUANTILE)
+        return None if quantile is None else max(self.hedge_min_delay, quantile)
+
+    @staticmethod
+    def _content(completion) -> str:
+        content = completion.choices[0].message.content if completion.choices else None
+        if not content:
+            raise EmptyResponse("empty completion")
+        return content
+
+    def complete(self, kwargs: dict, on_usage: UsageCallback = None) -> str:
+        """Answer text for chat.completions.create(**kwargs); kwargs["model"] is replaced per attempt."""
+        last_error: Optional[Exception] = None
+        for model in self.models:
+            for attempt in range(self.max_attempts):
+                if not self.breakers[model].allow():
+                    break
+                start_time = time.time()
+                try:
+                    completion = self.client.chat.completions.create(**{**kwargs, "model": model})
+                    content = self._content(completion)
+                except Exception as e:
+                    self._record_failure(model, e)
+                    last_error = e
+                    if not self._should_retry(model, attempt, e):
+                        break
+                    time.sleep(backoff_delay(attempt, self.retry_delay))
+                    continue
+                self._record_success(model, time.time() - start_time)
+                if on_usage is not None:
+                    on_usage(completion.usage)
+                return content
+        raise LLMUnavailable(f"no model answered: {last_error}") from last_error
+
+    async def _acreate(self, model: str, kwargs: dict, on_usage: UsageCallback) -> str:
+        start_time = time.time()
+        try:
+            completion = await self.async_client.chat.completions.create(**{**kwargs, "model": model})
+            content = self._content(completion)
+        except asyncio.CancelledError:
+            self.breakers[model].release()
+            raise
+        except Exception as e:
+            self._record_failure(model, e)
+            raise
+        self._record_success(model, time.time() - start_time)
+        if on_usage is not None:
+            on_usage(completion.usage)
+        return content
+
+    async def _ahedged(self, model: str, kwargs: dict, on_usage: UsageCallback) -> str:
+        """One attempt, duplicated if it outlives the model's hedge delay; the first answer wins."""
+        delay = self._hedge_delay(model)
+        if delay is None:
+            return await self._acreate(model, kwargs, on_usage)
+
+        tasks = [asyncio.ensure_future(self._acreate(model, kwargs, on_usage))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            # The hedge goes through the breaker too: a half-open circuit admits only the first request
+            if not done and self.breakers[model].allow():
+                tasks.append(asyncio.ensure_future(self._acreate(model, kwargs, on_usage)))
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if len(tasks) > 1:
+                            llm_hedges.labels(model, "won" if task is tasks[1] else "lost").inc()
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def acomplete(self, kwargs: dict, on_usage: UsageCallback = None) -> str:
+        """Async complete(), with hedging."""
+        last_error: Optional[Exception] = None
+        for model in self.models:
+            for attempt in range(self.max_attempts):
+                if not self.breakers[model].allow():
+                    break
+                try:
+                    return await self._ahedged(model, kwargs, on_usage)
+                except Exception as e:
+                    last_error = e
+                    if not self._should_retry(model, attempt, e):
+                        break
+                    await asyncio.sleep(backoff_delay(attempt, self.retry_delay))
+        raise LLMUnavailable(f"no model answered: {last_error}") from last_error
+
+    async def _astream_once(self, model: str, kwargs: dict, on_usage: UsageCallback) -> AsyncIterator[str]:
+        start_time = time.time()
+        started = False
+        try:
+            stream = await self.async_client.chat.completions.create(
+                **{**kwargs, "model": model}, stream=True, stream_options={"include_usage": True}
+            )
+            async with stream:
+                async for chunk in stream:
+                    if on_usage is not None and getattr(chunk, "usage", None) is not None:
+                        on_usage(chunk.usage)
+                    token = chunk.choices[0].delta.content if chunk.choices else None
+                    if token:
+                        started = True
+                        yield token
+            if not started:
+                raise EmptyResponse("empty stream")
+        except Exception as e:
+            self._record_failure(model, e)
+            raise
+        except BaseException:
+            # Cancelled, or the consumer stopped reading
+            self.breakers[model].release()
+            raise
+        self._record_success(model, time.time() - start_time)
+
+    async def astream(self, kwargs: dict, on_usage: UsageCallback = None) -> AsyncIterator[str]:
+        """
+        Yield answer tokens as they arrive.
+
+        Retries and fallback only happen before the first token; an error
+        after that is raised to the caller. Streams are not hedged.
+        """
+        last_error: Optional[Exception] = None
+        for model in self.models:
+            for attempt in range(self.max_attempts):
+                if not self.breakers[model].allow():
+                    break
+                started = False
+                try:
+                    async for token in self._astream_once(model, kwargs, on_usage):
+                        started = True
+                        yield token
+                    return
+                except Exception as e:
+                    if started:
+                        raise
+                    last_error = e
+                    if not self._should_retry(model, attempt, e):
+                        break
+                    await asyncio.sleep(backoff_delay(attempt, self.retry_delay))
+        raise LLMUnavailable(f"no model answered: {last_error}") from last_error
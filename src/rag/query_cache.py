@@ -0,0 +1,104 @@
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import numpy as np
+from ..config.settings import *
+from ..utils.metrics import cache_hits, cache_misses, cache_evictions
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ttl seconds."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] < time.monotonic():
+                del self._data[key]
+                cache_evictions.labels(self.name, "expired").inc()
+                entry = _MISSING
+            if entry is _MISSING:
+                cache_misses.labels(self.name).inc()
+                return default
+            self._data.move_to_end(key)
+            cache_hits.labels(self.name).inc()
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                cache_evictions.labels(self.name, "lru").inc()
+
+    def clear(self):
+        with self._lock:
+            if self._data:
+                cache_evictions.labels(self.name, "invalidated").inc(len(self._data))
+            self._data.clear()
+
+
+def normalize_query(text: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the answer."""
+    return re.sub(r"[\s?!.]+$", "", " ".join(text.lower().split()))
+
+
+class QueryCache:
+    """
+    Caches in front of the Retriever.
+
+    Normalized query text maps to its embedding, and (embedding hash, k,
+    index version) maps to the retrieved chunk IDs. Every VectorStore
+    mutation or rebuild gets a new version, so stale results are never
+    served; the result cache is cleared as soon as a newer version shows
+    up. Versions only grow, so a thread still searching an older store
+    cannot clear the newer entries, and its results are not stored.
+    """
+
+    def __init__(self):
+        self.embeddings = TTLCache("query_embedding", QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_TTL)
+        self.results = TTLCache("retrieval_results", RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL)
+        self._index_version: Optional[int] = None
+        self._version_lock = threading.Lock()
+
+    def get_embedding(self, query: str) -> Optional[np.ndarray]:
+        return self.embeddings.get(normalize_query(query))
+
+    def put_embedding(self, query: str, embedding: np.ndarray):
+        self.embeddings.put(normalize_query(query), embedding)
+
+    def _advance(self, index_version: int) -> bool:
+        """Note index_version; False if a newer version has been seen already."""
+        with self._version_lock:
+            if self._index_version is None or index_version > self._index_version:
+                self.results.clear()
+                self._index_version = index_version
+            return index_version == self._index_version
+
+    def _result_key(self, embedding: np.ndarray, k: int, index_version: int) -> tuple:
+        digest = hashlib.blake2b(np.ascontiguousarray(embedding, dtype=np.float32).tobytes(), digest_size=16).digest()
+        return digest, k, index_version
+
+    def get_results(self, embedding: np.ndarray, k: int, index_version: int):
+        self._advance(index_version)
+        return self.results.get(self._result_key(embedding, k, index_version))
+
+    def put_results(self, embedding: np.ndarray, k: int, index_version: int, ids):
+        if self._advance(index_version):
+            self.results.put(self._result_key(embedding, k, index_version), list(ids))
@@ -0,0 +1,144 @@
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+from ..config.settings import *
+from ..utils.metrics import cache_hits, cache_misses, cache_evictions, llm_calls_saved, llm_latency_saved
+from .query_cache import normalize_query
+
+
+class ResponseCache:
+    """
+    Size-capped LRU cache of LLM answers stored in SQLite.
+
+    Entries are keyed by (LLM model, normalized query, retrieved context).
+    The context part is a hash of the chunk texts rather than their vector
+    IDs, which are only stable within one index build, so the cache stays
+    valid across rebuilds and can be shared by replicas on the same volume.
+
+    With semantic matching enabled, a miss on the exact key falls back to
+    the cached answer whose query embedding is closest to the new one, as
+    long as it was generated from the same context and the cosine
+    similarity is at least similarity_threshold.
+    """
+
+    def __init__(self, path: Path = RESPONSE_CACHE_PATH, model: str = LLM_MODEL,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 semantic: bool = RESPONSE_CACHE_SEMANTIC,
+                 similarity_threshold: float = RESPONSE_CACHE_SIMILARITY):
+        self.path = Path(path)
+        self.model = model
+        self.max_entries = max_entries
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        # WAL lets several bot replicas read while one writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            # One transaction, so a replica opening the file at the same time cannot count rows twice
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    context_key TEXT NOT NULL,
+                    embedding BLOB,
+                    response TEXT NOT NULL,
+                    latency REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_context ON responses (context_key)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            # Row count kept by triggers, so put() needs no COUNT(*) and every replica sees the same size
+            self._conn.execute("CREATE TABLE IF NOT EXISTS response_count (entries INTEGER NOT NULL)")
+            self._conn.execute(
+                "INSERT INTO response_count SELECT COUNT(*) FROM responses "
+                "WHERE NOT EXISTS (SELECT 1 FROM response_count)"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS responses_added AFTER INSERT ON responses "
+                "BEGIN UPDATE response_count SET entries = entries + 1; END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS responses_removed AFTER DELETE ON responses "
+                "BEGIN UPDATE response_count SET entries = entries - 1; END"
+            )
+
+    def _context_key(self, context: List[str]) -> str:
+        digest = hashlib.sha256(self.model.encode("utf-8"))
+        for chunk in context:
+            digest.update(b"\0" + chunk.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _key(self, query: str, context_key: str) -> str:
+        return hashlib.sha256(f"{context_key}\0{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+    def get(self, query: str, context: List[str], query_embedding: Optional[np.ndarray] = None) -> Optional[str]:
+        context_key = self._context_key(context)
+        key = self._key(query, context_key)
+        with self._lock:
+            row = self._conn.execute("SELECT response, latency FROM responses WHERE key = ?", (key,)).fetchone()
+            kind = "exact"
+            if row is None and self.semantic and query_embedding is not None:
+                row, key = self._nearest(context_key, query_embedding)
+                kind = "semantic"
+            if row is None:
+                cache_misses.labels("llm_response").inc()
+                return None
+
+            with self._conn:
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+
+        response, latency = row
+        cache_hits.labels("llm_response").inc()
+        llm_calls_saved.labels(kind).inc()
+        llm_latency_saved.inc(latency)
+        return response
+
+    def _nearest(self, context_key: str, query_embedding: np.ndarray):
+        rows = self._conn.execute(
+            "SELECT key, embedding, response, latency FROM responses "
+            "WHERE context_key = ? AND embedding IS NOT NULL ORDER BY last_used DESC LIMIT 256",
+            (context_key,)
+        ).fetchall()
+        if not rows:
+            return None, None
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        cached = np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob, _, _ in rows])
+        similarity = cached @ query / (np.linalg.norm(cached, axis=1) * np.linalg.norm(query) + 1e-12)
+        best = int(np.argmax(similarity))
+        if similarity[best] < self.similarity_threshold:
+            return None, None
+        key, _, response, latency = rows[best]
+        return (response, latency), key
+
+    def put(self, query: str, context: List[str], response: str, latency: float,
+            query_embedding: Optional[np.ndarray] = None):
+        """Store an answer together with the LLM latency it took to produce."""
+        context_key = self._context_key(context)
+        embedding = None if query_embedding is None else np.asarray(query_embedding, dtype=np.float32).tobytes()
+        key = self._key(query, context_key)
+        with self._lock, self._conn:
+            # An upsert rather than INSERT OR REPLACE: REPLACE deletes without firing the count trigger
+            self._conn.execute(
+                "INSERT INTO responses (key, context_key, embedding, response, latency, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                "embedding = excluded.embedding, response = excluded.response, "
+                "latency = excluded.latency, last_used = excluded.last_used",
+                (key, context_key, embedding, response, latency, time.time())
+            )
+            (count,) = self._conn.execute("SELECT entries FROM response_count").fetchone()
+            if count > self.max_entries:
+                evicted = self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                ).rowcount
+                cache_evictions.labels("llm_response", "lru").inc(evicted)
@@ -0,0 +1,300 @@
+"""
+Retrieval as a standalone local service.
+
+    python -m src.rag.retrieval_service --workers 4 --port 8700
+    python -m src.rag.retrieval_service --workers 4 --unix /tmp/rag-retrieval.sock
+
+The parent process brings the saved index up to date with docs/, binds one
+listening socket and starts --workers processes that all accept on it. Each
+worker runs DocumentLoader + Retriever behind a QueryBatcher and maps the
+saved FAISS index read-only, so the vectors are in memory once no matter
+how many workers serve them. Chunk texts and the BM25 postings are still
+loaded per worker.
+
+While running, the parent re-indexes changed documents (like the bot's
+DocsWatcher) and workers pick up each newly saved index on their own.
+Bot shards and replicas use it by setting RETRIEVAL_SERVICE_URL, which
+makes RAGAgent search through RemoteRetriever.
+"""
+import os
+import sys
+import time
+import signal
+import socket
+import asyncio
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+import faiss
+import httpx
+from aiohttp import web
+from ..config.settings import *
+from .agent import DocumentLoader, Retriever, Retrieval
+from .embedding_backend import load_embedding_model
+from .batching import QueryBatcher
+from .chunk_meta import ChunkMeta
+from .docs_watcher import DocsWatcher
+from .index_store import IndexStore
+from .vector_store import VectorStore
+
+
+def retrieval_to_json(retrieval: Retrieval) -> dict:
+    embedding = retrieval.query_embedding
+    return {
+        "embedding": embedding.tolist() if embedding is not None else None,
+        "ids": retrieval.ids,
+        "docs": retrieval.docs,
+        "metas": [meta.to_list() if meta is not None else None for meta in retrieval.metas],
+    }
+
+
+def retrieval_from_json(data: dict) -> Retrieval:
+    embedding = data["embedding"]
+    return Retrieval(
+        np.asarray(embedding, dtype=np.float32) if embedding is not None else None,
+        data["ids"],
+        data["docs"],
+        [ChunkMeta.from_list(meta) if meta is not None else None for meta in data["metas"]],
+    )
+
+
+class RemoteRetriever:
+    """
+    Retriever.search_many() served by the retrieval service.
+
+    QueryBatcher calls it on its executor threads, so concurrent bot
+    queries still travel as one request. The httpx client is thread-safe
+    and keeps connections alive between calls.
+    """
+
+    def __init__(self, url: str = RETRIEVAL_SERVICE_URL, timeout: float = RETRIEVAL_SERVICE_TIMEOUT):
+        if url.startswith("unix://"):
+            transport = httpx.HTTPTransport(uds=url[len("unix://"):])
+            url = "http://retrieval-service"
+        else:
+            transport = None
+        self.url = url
+        self.client = httpx.Client(base_url=url, transport=transport, timeout=timeout)
+
+    def search_many(self, queries: List[str], k: int = 3) -> List[Retrieval]:
+        try:
+            response = self.client.post("/search", json={"queries": queries, "k": k})
+            response.raise_for_status()
+            return [retrieval_from_json(result) for result in response.json()["results"]]
+        except Exception as e:
+            print(f"Error in remote retrieval: {e}")
+            return [Retrieval(None, [], [], []) for _ in queries]
+
+    def health(self) -> dict:
+        response = self.client.get("/health")
+        response.raise_for_status()
+        return response.json()
+
+
+# Worker process
+
+def _create_app(retriever: Retriever, batcher: QueryBatcher, index_dir: Path, loaded_mtime: Optional[int]):
+    async def search(request):
+        try:
+            body = await request.json()
+            queries = body["queries"]
+            k = int(body.get("k", DEFAULT_TOP_K))
+        except (ValueError, KeyError, TypeError):
+            raise web.HTTPBadRequest(text="expected {\"queries\": [...], \"k\": n}")
+        if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries) or k < 1:
+            raise web.HTTPBadRequest(text="queries must be a list of strings and k positive")
+
+        # Queries from concurrent requests are batched together as well
+        results = await asyncio.gather(*(batcher.retrieve(query, k) for query in queries))
+        return web.json_response({"results": [retrieval_to_json(result) for result in results]})
+
+    async def health(request):
+        vector_store = retriever.vector_store
+        return web.json_response({"pid": os.getpid(), "chunks": len(vector_store), "version": vector_store.version,
+                                  "memory_mib": _memory_mib()})
+
+    async def watch_index(app):
+        task = asyncio.create_task(_watch_index(retriever, index_dir, loaded_mtime))
+        yield
+        task.cancel()
+
+    app = web.Application()
+    app.router.add_post("/search", search)
+    app.router.add_get("/health", health)
+    app.cleanup_ctx.append(watch_index)
+    return app
+
+
+def _memory_mib() -> dict:
+    """Resident memory of this process: private (anonymous) pages and file-backed pages such as the mapped index."""
+    memory = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key = line.split(":")[0]
+                if key in ("VmRSS", "RssAnon", "RssFile"):
+                    memory[key] = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return memory
+
+
+def _load_store(index_dir: Path) -> VectorStore:
+    vector_store = VectorStore.load(index_dir, mmap=True)
+    if len(vector_store) != len(vector_store.texts):
+        # The index and the chunks were written by different saves
+        raise ValueError("index and chunk files do not match")
+    return vector_store
+
+
+def _manifest_mtime(index_dir: Path) -> Optional[int]:
+    try:
+        return (index_dir / "manifest.json").stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+async def _watch_index(retriever: Retriever, index_dir: Path, last: Optional[int],
+                       interval: float = RETRIEVAL_SERVICE_RELOAD_INTERVAL):
+    """Swap in the index each time the parent saves a new one (the manifest is written last)."""
+    while True:
+        await asyncio.sleep(interval)
+        mtime = _manifest_mtime(index_dir)
+        if mtime is None or mtime == last:
+            continue
+        try:
+            retriever.vector_store = await asyncio.to_thread(_load_store, index_dir)
+            last = mtime
+            print(f"Worker {os.getpid()} swapped in index with {len(retriever.vector_store)} chunks")
+        except Exception as e:
+            print(f"Worker {os.getpid()} could not load the new index, retrying: {e}")
+
+
+def _worker_main(sock: socket.socket, index_dir: Path, threads: int):
+    # Parallelism comes from the worker processes; oversubscribing cores only adds contention
+    faiss.omp_set_num_threads(threads)
+
+    document_loader = DocumentLoader(cache_dir=None, embedding_model=load_embedding_model(threads=threads))
+    loaded_mtime = _manifest_mtime(index_dir)
+    retriever = Retriever(document_loader, _load_store(index_dir))
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="retrieval-service")
+    batcher = QueryBatcher(retriever, executor)
+    print(f"Worker {os.getpid()} serving {len(retriever.vector_store)} chunks")
+    web.run_app(_create_app(retriever, batcher, index_dir, loaded_mtime), sock=sock, print=None)
+
+
+# Parent process
+
+class _IndexBuilder:
+    """Keeps the saved index in sync with the docs; has the parts of RAGAgent DocsWatcher uses."""
+
+    def __init__(self, index_dir: Path):
+        self.document_loader = DocumentLoader()
+        self.index_store = IndexStore(index_dir)
+
+    def reload(self) -> dict:
+        self.index_store.sync(self.document_loader)
+        return self.index_store.last_changes
+
+    async def areload(self) -> dict:
+        return await asyncio.to_thread(self.reload)
+
+
+def _listen(host: str, port: int, unix_path: Optional[str]) -> socket.socket:
+    if unix_path:
+        if os.path.exists(unix_path):
+            os.unlink(unix_path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(unix_path)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+    sock.listen(1024)
+    return sock
+
+
+async def _supervise(builder: _IndexBuilder, start_worker, workers: list):
+    """
+    Restart workers that exit. Restarts after failed starts back off
+    exponentially; once a worker has failed to start
+    RETRIEVAL_SERVICE_MAX_FAILED_STARTS times in a row the service stops.
+    """
+    # Referenced for as long as the supervisor runs, so the task cannot be collected
+    watcher = asyncio.create_task(DocsWatcher(builder).run()) if DOCS_WATCH_INTERVAL > 0 else None
+    started = [time.monotonic()] * len(workers)
+    failed_starts = [0] * len(workers)
+    restart_at: List[Optional[float]] = [None] * len(workers)
+    while True:
+        await asyncio.sleep(1)
+        now = time.monotonic()
+        for i, process in enumerate(workers):
+            if restart_at[i] is not None:
+                if now >= restart_at[i]:
+                    workers[i] = start_worker()
+                    started[i], restart_at[i] = now, None
+                continue
+            if process.is_alive():
+                continue
+            failed_starts[i] = failed_starts[i] + 1 if now - started[i] < RETRIEVAL_SERVICE_MIN_UPTIME else 0
+            if failed_starts[i] >= RETRIEVAL_SERVICE_MAX_FAILED_STARTS:
+                raise RuntimeError(f"Worker exited with code {process.exitcode} right after starting "
+                                   f"{failed_starts[i]} times in a row, stopping the service")
+            delay = min(RETRIEVAL_SERVICE_RESTART_MAX_DELAY, 2 ** failed_starts[i])
+            print(f"Worker {process.pid} exited with code {process.exitcode}, restarting in {delay}s")
+            restart_at[i] = now + delay
+
+
+def serve(host: str = RETRIEVAL_SERVICE_HOST, port: int = RETRIEVAL_SERVICE_PORT, unix_path: Optional[str] = None,
+          workers: int = RETRIEVAL_SERVICE_WORKERS, threads: int = RETRIEVAL_SERVICE_THREADS,
+          index_dir: Path = INDEX_DIR):
+    """Run the retrieval service until interrupted."""
+    start_time = time.time()
+    index_dir = Path(index_dir)
+    builder = _IndexBuilder(index_dir)
+    builder.reload()
+    print(f"Index ready in {time.time() - start_time:.2f} seconds")
+
+    sock = _listen(host, port, unix_path)
+    # spawn, not fork: the parent already holds torch threads
+    context = multiprocessing.get_context("spawn")
+
+    def start_worker():
+        process = context.Process(target=_worker_main, args=(sock, index_dir, threads), daemon=True)
+        process.start()
+        return process
+
+    processes = [start_worker() for _ in range(workers)]
+    # Stopping the parent with SIGTERM still takes the workers down with it
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"Retrieval service listening on {unix_path or f'{host}:{port}'} with {workers} workers")
+    try:
+        asyncio.run(_supervise(builder, start_worker, processes))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        sock.close()
+        if unix_path and os.path.exists(unix_path):
+            os.unlink(unix_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve document retrieval to bot shards and replicas.")
+    parser.add_argument("--host", default=RETRIEVAL_SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=RETRIEVAL_SERVICE_PORT)
+    parser.add_argument("--unix", default=None, help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=RETRIEVAL_SERVICE_WORKERS)
+    parser.add_argument("--threads", type=int, default=RETRIEVAL_SERVICE_THREADS, help="embedding/FAISS threads per worker")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.unix, args.workers, args.threads)
+
+
+if __name__ == "__main__":
+    main()
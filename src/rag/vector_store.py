@@ -0,0 +1,146 @@
+import os
+import json
+import itertools
+from pathlib import Path
+from typing import List, Dict, Optional
+import numpy as np
+import faiss
+from ..config.settings import *
+from .index_factory import build_index, mmap_flags, search_parameters, supports_removal
+from .bm25_index import BM25Index
+from .chunk_meta import ChunkMeta
+
+
+# Process-wide so that two different stores never share a version
+_versions = itertools.count(1)
+
+
+class VectorStore:
+    def __init__(self, dimension: int = 384, index_type: str = "flat", corpus_size: int = 0):  # MiniLM dimension
+        self.dimension = dimension
+        self.index_type = index_type
+        # L2 distance for similarity; vectors carry stable IDs so chunks can be removed by ID
+        self.index = build_index(index_type, dimension, corpus_size)
+        self.texts: Dict[int, str] = {}  # Store original texts by vector ID
+        self.meta: Dict[int, ChunkMeta] = {}  # Precomputed URLs, source and snippet by vector ID
+        self.sparse = BM25Index()  # Keyword index over the same chunks and IDs
+        self.next_id = 0
+        self.version = next(_versions)  # Changes on every mutation
+
+    def __len__(self) -> int:
+        return self.index.ntotal
+
+    @property
+    def supports_removal(self) -> bool:
+        return supports_removal(self.index_type)
+
+    def add_embeddings(self, texts: List[str], embeddings: np.ndarray,
+                       metas: Optional[List[ChunkMeta]] = None) -> List[int]:
+        """Add embeddings to the FAISS index and return their vector IDs"""
+        if not texts:
+            return []
+        embeddings_array = np.ascontiguousarray(embeddings, dtype='float32')
+        if not self.index.is_trained:
+            print(f"Training {self.index_type} index on {len(embeddings_array)} vectors...")
+            self.index.train(embeddings_array)
+        ids = np.arange(self.next_id, self.next_id + len(texts), dtype='int64')
+        self.index.add_with_ids(embeddings_array, ids)
+        self.texts.update(zip(ids.tolist(), texts))
+        if metas is not None:
+            self.meta.update(zip(ids.tolist(), metas))
+        self.sparse.add(ids.tolist(), texts)
+        self.next_id += len(texts)
+        self.version = next(_versions)
+        return ids.tolist()
+
+    def remove_ids(self, ids: List[int]):
+        """Remove vectors (and their texts) from the index"""
+        if not ids:
+            return
+        self.index.remove_ids(np.array(ids, dtype='int64'))
+        removed = [vector_id for vector_id in ids if vector_id in self.texts]
+        self.sparse.remove(removed, [self.texts.pop(vector_id) for vector_id in removed])
+        for vector_id in removed:
+            self.meta.pop(vector_id, None)
+        self.version = next(_versions)
+
+    def search_ids_many(self, query_embeddings: np.ndarray, k: int = 3,
+                        nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> List[List[int]]:
+        """
+        Return the IDs of the k nearest chunks for each row of query_embeddings.
+
+        nprobe (IVF) and ef_search (HNSW) trade recall for latency per call;
+        they default to the values the index was built with.
+        """
+        query_array = np.ascontiguousarray(query_embeddings, dtype='float32').reshape(-1, self.dimension)
+        params = search_parameters(self.index_type, nprobe, ef_search)
+        distances, indices = self.index.search(query_array, k, params=params)
+        return [[i for i in row if i != -1] for row in indices.tolist()]
+
+    def search_ids(self, query_embedding: np.ndarray, k: int = 3,
+                   nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> List[int]:
+        """Return the IDs of the k nearest chunks."""
+        return self.search_ids_many(query_embedding, k, nprobe, ef_search)[0]
+
+    def search(self, query_embedding: np.ndarray, k: int = 3,
+               nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> List[str]:
+        """Search for most similar documents"""
+        return [self.texts[i] for i in self.search_ids(query_embedding, k, nprobe, ef_search)]
+
+    def save(self, directory: Path):
+        """Write the FAISS index and chunk texts to directory."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        tmp_index = directory / "index.faiss.tmp"
+        faiss.write_index(self.index, str(tmp_index))
+        os.replace(tmp_index, directory / "index.faiss")
+
+        tmp_chunks = directory / "chunks.json.tmp"
+        with open(tmp_chunks, 'w', encoding='utf-8') as f:
+            json.dump({
+                "index_type": self.index_type,
+                "next_id": self.next_id,
+                "texts": self.texts,
+                "meta": {vector_id: meta.to_list() for vector_id, meta in self.meta.items()},
+            }, f)
+        os.replace(tmp_chunks, directory / "chunks.json")
+
+        self.sparse.save(directory)
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = False) -> "VectorStore":
+        """
+        Load a store previously written by save().
+
+        With mmap=True the FAISS index is mapped read-only instead of read
+        into memory, so processes loading the same file share its pages.
+        Index types FAISS cannot map are read normally.
+        """
+        directory = Path(directory)
+        with open(directory / "chunks.json", 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index = None
+        if mmap:
+            try:
+                index = faiss.read_index(str(directory / "index.faiss"), mmap_flags(data["index_type"]))
+            except RuntimeError as e:
+                print(f"Could not memory-map index, reading it instead: {e}")
+        if index is None:
+            index = faiss.read_index(str(directory / "index.faiss"))
+
+        store = cls(dimension=index.d, index_type=data["index_type"])
+        store.index = index
+        store.texts = {int(vector_id): text for vector_id, text in data["texts"].items()}
+        store.meta = {int(vector_id): ChunkMeta.from_list(meta) for vector_id, meta in data.get("meta", {}).items()}
+        store.next_id = data["next_id"]
+
+        try:
+            store.sparse = BM25Index.load(directory)
+            if len(store.sparse) != len(store.texts):
+                raise ValueError("chunk count does not match the vector index")
+        except Exception as e:
+            print(f"Rebuilding keyword index ({e})")
+            store.sparse = BM25Index()
+            store.sparse.add(list(store.texts), list(store.texts.values()))
+        return store
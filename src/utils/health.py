@@ -0,0 +1,31 @@
+import threading
+from typing import Callable
+from wsgiref.simple_server import make_server, WSGIRequestHandler
+from prometheus_client import make_wsgi_app
+from prometheus_client.exposition import ThreadingWSGIServer
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int, is_ready: Callable[[], bool], addr: str = "0.0.0.0"):
+    """
+    Serve Prometheus metrics plus a readiness probe on one port.
+
+    /ready answers 200 once is_ready() is true and 503 while warming up;
+    every other path serves the metrics, like start_http_server() did.
+    """
+    metrics_app = make_wsgi_app()
+
+    def app(environ, start_response):
+        if environ.get("PATH_INFO") == "/ready":
+            ready = is_ready()
+            start_response("200 OK" if ready else "503 Service Unavailable", [("Content-Type", "text/plain")])
+            return [b"ready\n" if ready else b"warming up\n"]
+        return metrics_app(environ, start_response)
+
+    server = make_server(addr, port, app, ThreadingWSGIServer, handler_class=_QuietHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
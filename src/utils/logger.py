@@ -21,6 +21,8 @@ def setup_logger(name):
                 log_record['latency_ms'] = record.latency_ms
             if hasattr(record, 'query'):
                 log_record['query'] = record.query
+            if hasattr(record, 'spans'):
+                log_record['spans'] = record.spans
 
     # File handler
     log_file = os.path.join('logs', f'{name}.log')
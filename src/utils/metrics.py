@@ -0,0 +1,65 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Cache effectiveness, labelled by cache name
+cache_hits = Counter('cache_hits', 'Cache hits', ['cache'])
+cache_misses = Counter('cache_misses', 'Cache misses', ['cache'])
+cache_evictions = Counter('cache_evictions', 'Cache evictions (LRU, TTL expiry or invalidation)', ['cache', 'reason'])
+
+# LLM calls avoided by the response cache and the generation time they would have cost
+llm_calls_saved = Counter('llm_calls_saved', 'LLM calls answered from the response cache', ['match'])
+llm_latency_saved = Counter('llm_latency_saved_seconds', 'LLM latency saved by response cache hits')
+
+# Streaming generation: how long users wait before the first answer token appears
+llm_time_to_first_token = Histogram(
+    'llm_time_to_first_token_seconds', 'Time from LLM request to the first streamed answer token',
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+)
+
+# Per-stage latency: embed, search, sparse_search, retrieval, pack, prompt, llm, discord_send and end_to_end
+# (plus index_embed while the index is built)
+stage_latency = Histogram(
+    'rag_stage_seconds', 'Latency of one pipeline stage', ['stage'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+)
+
+# LLM usage
+llm_retries = Counter('llm_retries', 'LLM attempts that failed and were retried')
+llm_tokens = Counter('llm_tokens', 'Tokens reported by the LLM API', ['kind'])
+
+# Per-model LLM health: request outcomes (success, error, timeout, empty), latency of
+# successful requests, hedges and circuit breaker state
+llm_requests = Counter('llm_requests', 'LLM requests by model and outcome', ['model', 'result'])
+llm_request_seconds = Histogram(
+    'llm_request_seconds', 'Latency of successful LLM requests', ['model'],
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+)
+llm_hedges = Counter('llm_hedges', 'Hedged LLM requests, by whether the hedge answered first', ['model', 'result'])
+llm_fallbacks = Counter('llm_fallbacks', 'Answers served by a fallback model', ['model'])
+llm_circuit_open = Gauge('llm_circuit_open', '1 while the model is skipped after repeated failures', ['model'])
+
+# Hot reloads of the document index
+index_reload_seconds = Histogram(
+    'index_reload_seconds', 'Time to re-index changed documents and swap in the new index',
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600)
+)
+index_reloads = Counter('index_reloads', 'Index reloads by outcome', ['result'])
+index_version = Gauge('index_version', 'Version of the vector index currently serving queries')
+
+# Document ingestion progress
+ingest_files = Counter('ingest_files', 'Documents chunked for indexing')
+ingest_chunks = Counter('ingest_chunks', 'Chunks produced for indexing')
+ingest_bytes = Counter('ingest_bytes', 'Characters of chunk text produced for indexing')
+ingest_indexed_chunks = Counter('ingest_indexed_chunks', 'Chunks embedded and added to the vector index')
+
+# /ask admission control: queued requests, time spent queued, and requests turned
+# away by reason (user_rate, guild_rate, queue_full)
+request_queue_depth = Gauge('request_queue_depth', 'Requests waiting in the fair-share queue')
+request_queue_wait = Histogram(
+    'request_queue_wait_seconds', 'Time a request waited in the queue before being answered',
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120)
+)
+requests_rejected = Counter('requests_rejected', 'Requests turned away before reaching the RAG agent', ['reason'])
+
+# Startup: duration of each phase and whether the RAG agent is serving yet
+startup_phase_seconds = Gauge('startup_phase_seconds', 'Duration of one startup phase', ['phase'])
+rag_ready = Gauge('rag_ready', '1 once the RAG agent can answer queries')
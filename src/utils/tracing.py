@@ -0,0 +1,71 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from .metrics import stage_latency
+from .logger import setup_logger
+from ..config.settings import TRACE_REQUESTS
+
+logger = setup_logger('rag_trace')
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar('rag_trace', default=None)
+
+
+class Trace:
+    """Span timings (ms) collected for one request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.spans[stage] = round(self.spans.get(stage, 0.0) + seconds * 1000, 2)
+
+
+def record(stage: str, seconds: float):
+    """Observe a stage latency and add it to the current request's trace, if any."""
+    stage_latency.labels(stage).observe(seconds)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str):
+    """Time the enclosed block as one pipeline stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def trace_request(**fields):
+    """
+    Collect the spans recorded while a request is handled and write them
+    as one JSON log record when it finishes. Does nothing unless
+    TRACE_REQUESTS is on.
+
+    Spans recorded on executor threads (the micro-batched embed and search)
+    are shared by several requests and only reach the histograms; the
+    request sees them as its "retrieval" span.
+    """
+    if not TRACE_REQUESTS:
+        yield None
+        return
+
+    trace = Trace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        logger.info(
+            "request trace",
+            extra={
+                'latency_ms': round((time.perf_counter() - trace.start) * 1000, 2),
+                'spans': trace.spans,
+                **fields
+            }
+        )